@@ -0,0 +1,234 @@
+"""Admission control for DB-bound endpoints.
+
+At most ``ADMISSION_MAX_CONCURRENCY`` requests do database work at once; the
+rest wait in a bounded priority queue. Writes are admitted before reads, and
+list scans may only hold ``ADMISSION_MAX_SCAN_CONCURRENCY`` of the slots, so
+they can never starve writes. POSTs that only read (tag query execution and
+upstream API fetches) are long-running and are treated as scans, not writes.
+When the queue is full, or a request waits longer than
+``ADMISSION_QUEUE_TIMEOUT``, it is rejected immediately with
+``503 Service Unavailable`` and a ``Retry-After`` header. Health, docs and
+metrics routes bypass admission entirely.
+"""
+import asyncio
+import itertools
+import json
+import re
+import time
+
+from config import (
+    ADMISSION_ENABLED,
+    ADMISSION_MAX_CONCURRENCY,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_MAX_SCAN_CONCURRENCY,
+    ADMISSION_QUEUE_TIMEOUT,
+    ADMISSION_RETRY_AFTER,
+)
+
+# Priorities: lower is admitted first
+WRITE, READ, SCAN = 0, 1, 2
+PRIORITY_NAMES = {WRITE: "write", READ: "read", SCAN: "scan"}
+
+EXEMPT_PATHS = {"/health", "/docs", "/redoc", "/openapi.json", "/docs/oauth2-redirect"}
+EXEMPT_PREFIXES = ("/metrics/",)
+SCAN_PATHS = {
+    "/tags", "/params",
+    "/v2/tags", "/v2/params", "/v2/tags/by-option", "/v2/params/by-option",
+}
+# POST routes that run a tag's query or call upstream APIs rather than write
+SCAN_POST_RE = re.compile(r"^/v2/tags(/\d+)?/(execute|api-data)$")
+
+
+class Rejected(Exception):
+    """The request could not be admitted."""
+
+
+def classify(method: str, path: str) -> int | None:
+    """Return the admission priority for a request, or None if it is exempt."""
+    path = path.rstrip("/") or "/"
+    if path in EXEMPT_PATHS or path.startswith(EXEMPT_PREFIXES) or method == "OPTIONS":
+        return None
+    if method == "POST" and SCAN_POST_RE.match(path):
+        return SCAN
+    if method in ("POST", "PUT", "PATCH", "DELETE"):
+        return WRITE
+    if path in SCAN_PATHS:
+        return SCAN
+    return READ
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "future")
+
+    def __init__(self, priority: int, seq: int, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.future = future
+
+
+class AdmissionController:
+    """Priority-aware concurrency limiter with a bounded wait queue."""
+
+    def __init__(self, max_concurrency: int, max_scan_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_scan_concurrency = min(max_scan_concurrency, max_concurrency)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._active_scans = 0
+        self._waiters: list[_Waiter] = []  # kept sorted by (priority, seq)
+        self._seq = itertools.count()
+        self._stats = {
+            p: {"admitted": 0, "rejected": 0, "queued": 0, "queue_time_total": 0.0, "queue_time_max": 0.0}
+            for p in PRIORITY_NAMES
+        }
+
+    def _can_run(self, priority: int) -> bool:
+        if self._active >= self.max_concurrency:
+            return False
+        return priority != SCAN or self._active_scans < self.max_scan_concurrency
+
+    def _start(self, priority: int) -> None:
+        self._active += 1
+        if priority == SCAN:
+            self._active_scans += 1
+
+    def _record(self, priority: int, waited: float) -> None:
+        stats = self._stats[priority]
+        stats["admitted"] += 1
+        stats["queue_time_total"] += waited
+        stats["queue_time_max"] = max(stats["queue_time_max"], waited)
+
+    def _reject(self, priority: int) -> Rejected:
+        self._stats[priority]["rejected"] += 1
+        return Rejected(PRIORITY_NAMES[priority])
+
+    @staticmethod
+    def _granted(waiter: _Waiter) -> bool:
+        return waiter.future.done() and waiter.future.exception() is None
+
+    async def acquire(self, priority: int) -> float:
+        """Wait for a slot; returns the time spent queued. Raises Rejected."""
+        if self._can_run(priority) and not any(w.priority <= priority for w in self._waiters):
+            self._start(priority)
+            self._record(priority, 0.0)
+            return 0.0
+
+        if len(self._waiters) >= self.max_queue:
+            # Make room by shedding the lowest-priority waiter, if it ranks below us
+            worst = self._waiters[-1] if self._waiters else None
+            if worst is None or worst.priority <= priority:
+                raise self._reject(priority)
+            self._waiters.pop()
+            self._reject(worst.priority)
+            worst.future.set_exception(Rejected(PRIORITY_NAMES[worst.priority]))
+
+        waiter = _Waiter(priority, next(self._seq), asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        self._waiters.sort(key=lambda w: (w.priority, w.seq))
+        self._stats[priority]["queued"] += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not self._granted(waiter):
+                if waiter.future.done():
+                    raise waiter.future.exception()  # shed while timing out
+                self._waiters.remove(waiter)
+                raise self._reject(priority)
+            # Granted just as the timeout fired: keep the slot
+        except asyncio.CancelledError:
+            if self._granted(waiter):
+                self.release(priority)
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+        waited = time.monotonic() - started
+        self._record(priority, waited)
+        return waited
+
+    def release(self, priority: int) -> None:
+        """Free a slot and hand it to the best eligible waiter."""
+        self._active -= 1
+        if priority == SCAN:
+            self._active_scans -= 1
+        for waiter in list(self._waiters):
+            if not self._can_run(waiter.priority):
+                continue
+            self._waiters.remove(waiter)
+            if waiter.future.done():
+                continue
+            self._start(waiter.priority)
+            waiter.future.set_result(None)
+            if self._active >= self.max_concurrency:
+                break
+
+    def snapshot(self) -> dict:
+        """Current load and per-priority queue-time metrics."""
+        return {
+            "enabled": ADMISSION_ENABLED,
+            "active": self._active,
+            "active_scans": self._active_scans,
+            "queued": len(self._waiters),
+            "max_concurrency": self.max_concurrency,
+            "max_scan_concurrency": self.max_scan_concurrency,
+            "max_queue": self.max_queue,
+            "priorities": {
+                PRIORITY_NAMES[p]: {
+                    **s,
+                    "queue_time_avg": s["queue_time_total"] / s["admitted"] if s["admitted"] else 0.0,
+                }
+                for p, s in self._stats.items()
+            },
+        }
+
+
+controller = AdmissionController(
+    max_concurrency=ADMISSION_MAX_CONCURRENCY,
+    max_scan_concurrency=ADMISSION_MAX_SCAN_CONCURRENCY,
+    max_queue=ADMISSION_MAX_QUEUE,
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+)
+
+
+class AdmissionMiddleware:
+    """ASGI middleware that holds an admission slot for the whole request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        priority = classify(scope["method"], scope["path"])
+        if priority is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await controller.acquire(priority)
+        except Rejected:
+            await _send_rejection(send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(priority)
+
+
+async def _send_rejection(send) -> None:
+    body = json.dumps({"detail": "Server is busy, please retry later"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(ADMISSION_RETRY_AFTER).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,198 @@
+"""Benchmark the v1 read routes on the async stack against the threadpool stack.
+
+Both apps serve the same routes from the same database:
+
+- ``async``: the v1 handlers from main.py (AsyncSession over asyncpg, crud_async.py)
+- ``threadpool``: sync handlers equivalent to the v1 routes before they moved to
+  asyncio (Session over psycopg2 via database.get_db, crud.py), which FastAPI
+  runs in its worker threadpool
+
+Each app runs in its own uvicorn process, without admission control or other
+middleware. N concurrent clients then request a mix of GET /tags, /tags/{id},
+/tags/{id}/params and /params for a fixed duration. Throughput and p50/p99
+latency are reported per stack.
+
+Usage (from backend/, against a database that already has some tags):
+    python benchmarks/async_vs_threadpool.py
+    python benchmarks/async_vs_threadpool.py --clients 100 --duration 20 --stacks async
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI, HTTPException  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+import crud  # noqa: E402
+import main  # noqa: E402
+from database import get_db  # noqa: E402
+from models import Param, Tag  # noqa: E402
+
+# ============== Apps ==============
+
+async_app = FastAPI()
+async_app.add_api_route("/tags", main.get_all_tags, response_model=list[Tag])
+async_app.add_api_route("/tags/{tag_id}", main.get_tag, response_model=Tag)
+async_app.add_api_route("/tags/{tag_id}/params", main.get_params_by_tag, response_model=list[Param])
+async_app.add_api_route("/params", main.get_all_params, response_model=list[Param])
+
+threadpool_app = FastAPI()
+
+
+@threadpool_app.get("/tags", response_model=list[Tag])
+def sync_get_all_tags(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    return crud.get_all_tags(db, skip=skip, limit=limit)
+
+
+@threadpool_app.get("/tags/{tag_id}", response_model=Tag)
+def sync_get_tag(tag_id: int, db: Session = Depends(get_db)):
+    tag = crud.get_tag(db, tag_id)
+    if not tag:
+        raise HTTPException(status_code=404, detail=f"Tag with ID {tag_id} not found")
+    return tag
+
+
+@threadpool_app.get("/tags/{tag_id}/params", response_model=list[Param])
+def sync_get_params_by_tag(tag_id: int, db: Session = Depends(get_db)):
+    if not crud.get_tag(db, tag_id):
+        raise HTTPException(status_code=404, detail=f"Tag with ID {tag_id} not found")
+    return crud.get_params_by_tag_id(db, tag_id)
+
+
+@threadpool_app.get("/params", response_model=list[Param])
+def sync_get_all_params(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    return crud.get_all_params(db, skip=skip, limit=limit)
+
+
+STACKS = {"async": "async_app", "threadpool": "threadpool_app"}
+
+# ============== Driver ==============
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(app_name: str, port: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", f"benchmarks.async_vs_threadpool:{app_name}",
+            "--app-dir", BACKEND_DIR, "--port", str(port), "--log-level", "warning", "--no-access-log",
+        ],
+        cwd=BACKEND_DIR,
+        # SQL echo goes to stdout; discard it so it does not slow the server down
+        stdout=subprocess.DEVNULL,
+    )
+
+
+async def _wait_ready(client: httpx.AsyncClient, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if (await client.get("/tags", params={"limit": 1})).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError("Server did not become ready")
+        await asyncio.sleep(0.2)
+
+
+def _request_mix(tag_ids: list[int], page_size: int) -> list[tuple[str, dict]]:
+    mix = [("/tags", {"limit": page_size}), ("/params", {"limit": page_size})]
+    for tag_id in tag_ids:
+        mix += [(f"/tags/{tag_id}", {}), (f"/tags/{tag_id}/params", {})]
+    return mix
+
+
+async def _run_stack(base_url: str, args) -> dict:
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await _wait_ready(client)
+        tag_ids = [t["id"] for t in (await client.get("/tags", params={"limit": 100})).json()]
+        if not tag_ids:
+            raise RuntimeError("The database has no tags; create some before benchmarking")
+        mix = _request_mix(tag_ids, args.page_size)
+
+        latencies: list[float] = []
+        errors = 0
+        measuring = False
+
+        async def worker(seed: int) -> None:
+            nonlocal errors
+            rng = random.Random(seed)
+            while not stop.is_set():
+                path, params = rng.choice(mix)
+                started = time.perf_counter()
+                try:
+                    ok = (await client.get(path, params=params)).status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if measuring:
+                    latencies.append(time.perf_counter() - started)
+                    errors += not ok
+
+        stop = asyncio.Event()
+        workers = [asyncio.create_task(worker(i)) for i in range(args.clients)]
+        await asyncio.sleep(args.warmup)
+        measuring = True
+        measured_from = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        measuring = False
+        elapsed = time.perf_counter() - measured_from
+        stop.set()
+        await asyncio.gather(*workers)
+
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": cuts[49] * 1000,
+        "p99_ms": cuts[98] * 1000,
+    }
+
+
+def main_cli(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare the async and threadpool v1 stacks.")
+    parser.add_argument("--clients", type=int, default=50, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=10, help="measured seconds per stack")
+    parser.add_argument("--warmup", type=float, default=2, help="unmeasured seconds per stack")
+    parser.add_argument("--page-size", type=int, default=50, help="limit for list requests")
+    parser.add_argument("--stacks", nargs="+", choices=list(STACKS), default=list(STACKS))
+    args = parser.parse_args(argv)
+
+    results = {}
+    for stack in args.stacks:
+        port = _free_port()
+        server = _start_server(STACKS[stack], port)
+        try:
+            results[stack] = asyncio.run(_run_stack(f"http://127.0.0.1:{port}", args))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"{args.clients} clients, {args.duration:g}s per stack\n")
+    print(f"{'stack':<12} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for stack, r in results.items():
+        print(
+            f"{stack:<12} {r['requests']:>9} {r['errors']:>7} {r['rps']:>9.1f} "
+            f"{r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,123 @@
+"""Show that option_value searches use the GIN index at scale.
+
+Seeds tags and params (100k by default) with random option arrays inside one
+transaction, runs EXPLAIN (ANALYZE, BUFFERS) for the ``@>`` and ``&&`` queries
+that back /v2/params/by-option and /v2/tags/by-option, then rolls everything
+back (unless ``--keep``). Exits with status 1 if a plan does not use a Bitmap
+Index Scan on ix_params_option_value.
+
+Usage (from backend/, against a migrated database):
+    python benchmarks/option_search_explain.py
+    python benchmarks/option_search_explain.py --params 500000 --vocabulary 20000
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crud_v2 import _option_filters, get_connection  # noqa: E402
+
+INDEX_NAME = "ix_params_option_value"
+
+_SEED_TAGS = """
+INSERT INTO tags (tag, query, comment, dynamic_param_source, api_active, api_endpoint,
+    api_name, api_at_get_data, api_message, query_active, tag_active, query_cache_ttl)
+SELECT 'bench-' || g, '', '', '', false, '', '', false, '', true, true, 0
+FROM generate_series(1, %(tags)s) g
+RETURNING id
+"""
+
+# The correlated "WHERE g > 0" makes Postgres draw a new random array per row
+_SEED_PARAMS = """
+INSERT INTO params (tag_id, db_column, display_name, option_value, field_type, value_type, api_param)
+SELECT %(first_tag)s + g %% %(tags)s,
+       'col' || g,
+       'Column ' || g,
+       ARRAY(
+           SELECT 'opt-' || floor(random() * %(vocabulary)s)::int
+           FROM generate_series(1, %(options)s)
+           WHERE g > 0
+       )::varchar[],
+       CASE WHEN g %% 2 = 0 THEN 'select' ELSE 'text' END,
+       'string',
+       false
+FROM generate_series(1, %(params)s) g
+"""
+
+
+def _queries() -> list[tuple[str, str, list]]:
+    cases = [
+        ("params @> (contains one value)", ["opt-42"], []),
+        ("params @> (contains two values)", ["opt-42", "opt-43"], []),
+        ("params && (overlaps two values)", [], ["opt-7", "opt-8"]),
+    ]
+    queries = []
+    for label, contains, overlaps in cases:
+        where, values = _option_filters(contains, overlaps, None, None)
+        queries.append((label, f"SELECT p.* FROM params p WHERE {where} ORDER BY p.id LIMIT 100", values))
+
+    where, values = _option_filters(["opt-42"], [], "select", None)
+    queries.append((
+        "tags by option (@> with field_type)",
+        f"SELECT t.* FROM tags t WHERE t.id IN (SELECT p.tag_id FROM params p WHERE {where}) ORDER BY t.id LIMIT 100",
+        values,
+    ))
+    return queries
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--params", type=int, default=100_000, help="params to seed")
+    parser.add_argument("--params-per-tag", type=int, default=10)
+    parser.add_argument("--vocabulary", type=int, default=5_000, help="distinct option values")
+    parser.add_argument("--options", type=int, default=8, help="options per param")
+    parser.add_argument("--keep", action="store_true", help="commit the seeded rows instead of rolling back")
+    args = parser.parse_args(argv)
+
+    tags = max(1, args.params // args.params_per_tag)
+    conn = get_connection()
+    missing = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute(_SEED_TAGS, {"tags": tags})
+            first_tag = min(r[0] for r in cur.fetchall())
+            cur.execute(_SEED_PARAMS, {
+                "first_tag": first_tag,
+                "tags": tags,
+                "params": args.params,
+                "vocabulary": args.vocabulary,
+                "options": args.options,
+            })
+            cur.execute("ANALYZE tags")
+            cur.execute("ANALYZE params")
+            cur.execute("SELECT count(*) FROM params")
+            print(f"Seeded {tags} tags and {args.params} params ({cur.fetchone()[0]} params in table)\n")
+
+            for label, query, values in _queries():
+                cur.execute(f"EXPLAIN (ANALYZE, BUFFERS) {query}", values)
+                plan = "\n".join(r[0] for r in cur.fetchall())
+                uses_index = f"Bitmap Index Scan on {INDEX_NAME}" in plan
+                if not uses_index:
+                    missing.append(label)
+                print(f"== {label}: {'uses' if uses_index else 'DOES NOT use'} {INDEX_NAME}")
+                print(plan, end="\n\n")
+
+        if args.keep:
+            conn.commit()
+        else:
+            conn.rollback()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    if missing:
+        print(f"No bitmap index scan for: {', '.join(missing)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Compare payload size and encode time of the negotiated response formats.
+
+Builds tags in a MemoryStorage (no database needed), reads a page the way
+GET /v2/tags does, and encodes it as JSON and MessagePack in the row and
+columnar layouts with the same response classes negotiation.render uses.
+Reports raw and gzipped size (gzip at GZipMiddleware's default level) and the
+median encode and compress times.
+
+Usage (from backend/):
+    python benchmarks/response_formats.py
+    python benchmarks/response_formats.py --tags 5000 --params 8 --options 50
+"""
+import argparse
+import gzip
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from memory_storage import MemoryStorage  # noqa: E402
+from negotiation import MsgPackResponse, to_columnar  # noqa: E402
+
+GZIP_LEVEL = 9  # GZipMiddleware's default compresslevel
+
+
+def _seed(storage: MemoryStorage, tags: int, params: int, options: int) -> None:
+    rng = random.Random(0)
+    regions = [f"region-{i}" for i in range(max(options * 4, 1))]
+    for t in range(tags):
+        storage.create_tag({
+            "tag": f"tag-{t}",
+            "query": f"SELECT * FROM sales_{t % 20} WHERE region = :region AND year = :year",
+            "comment": "Seeded for the response format benchmark",
+            "api_active": t % 3 == 0,
+            "api_endpoint": f"/api/tags/{t}" if t % 3 == 0 else "",
+            "params": [
+                {
+                    "db_column": f"col_{p}",
+                    "display_name": f"Column {p}",
+                    "option_value": rng.sample(regions, options) if p % 2 == 0 else [],
+                    "field_type": "select" if p % 2 == 0 else "text",
+                    "value_type": "string",
+                }
+                for p in range(params)
+            ],
+        })
+
+
+def _median_ms(fn, repeat: int) -> tuple[float, object]:
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, result
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare JSON, MessagePack and columnar payloads.")
+    parser.add_argument("--tags", type=int, default=1000, help="tags in the page")
+    parser.add_argument("--params", type=int, default=6, help="params per tag")
+    parser.add_argument("--options", type=int, default=20, help="options per select param")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per format")
+    args = parser.parse_args(argv)
+
+    storage = MemoryStorage()
+    _seed(storage, args.tags, args.params, args.options)
+    rows = storage.get_all_tags(limit=args.tags)
+
+    formats = {
+        "json rows": lambda: JSONResponse(rows).body,
+        "json columnar": lambda: JSONResponse(to_columnar(rows)).body,
+        "msgpack rows": lambda: MsgPackResponse(rows).body,
+        "msgpack columnar": lambda: MsgPackResponse(to_columnar(rows)).body,
+    }
+
+    print(f"{args.tags} tags x {args.params} params ({args.options} options per select param)\n")
+    print(f"{'format':<18} {'bytes':>10} {'gzip bytes':>11} {'vs json':>8} {'encode ms':>10} {'gzip ms':>8}")
+    baseline = None
+    for name, encode in formats.items():
+        encode_ms, body = _median_ms(encode, args.repeat)
+        gzip_ms, compressed = _median_ms(lambda: gzip.compress(body, GZIP_LEVEL), args.repeat)
+        baseline = baseline or len(body)
+        print(
+            f"{name:<18} {len(body):>10} {len(compressed):>11} {len(body) / baseline:>7.0%} "
+            f"{encode_ms:>10.2f} {gzip_ms:>8.2f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""Measure peak memory of GET /tags (or /params) with and without stream=true.
+
+Seeds tags with params (enough for the largest ``--limits`` value), then calls
+the v1 app in-process over ASGI for each limit, once buffered and once with
+``stream=true``, discarding body chunks as they are sent. The peak Python heap
+(tracemalloc) during each request is reported: buffered responses grow with
+``limit``, streamed ones should stay flat. Each streamed body is also checked
+to decode to the same JSON as the buffered one. The seeded tags are deleted
+afterwards unless ``--keep``.
+
+Exits with status 1 if a streamed body differs from the buffered one.
+
+Usage (from backend/, against a migrated database):
+    python benchmarks/stream_memory.py
+    python benchmarks/stream_memory.py --limits 1000 10000 50000 --params 8
+    python benchmarks/stream_memory.py --path /params
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from crud_v2 import get_connection  # noqa: E402
+from database import dispose_engines  # noqa: E402
+
+TAG_PREFIX = "bench-stream-"
+
+_SEED_TAGS = """
+INSERT INTO tags (tag, query, comment, dynamic_param_source, api_active, api_endpoint,
+    api_name, api_at_get_data, api_message, query_active, tag_active, query_cache_ttl)
+SELECT %(prefix)s || g, 'SELECT * FROM sales WHERE region = :region',
+       'Seeded for the stream memory benchmark', '', false, '', '', false, '', true, true, 0
+FROM generate_series(1, %(tags)s) g
+"""
+
+_SEED_PARAMS = """
+INSERT INTO params (tag_id, db_column, display_name, option_value, field_type, value_type, api_param)
+SELECT t.id, 'col' || p, 'Column ' || p, ARRAY['emea', 'latam', 'na']::varchar[], 'select', 'string', false
+FROM tags t, generate_series(1, %(params)s) p
+WHERE t.tag LIKE %(pattern)s
+"""
+
+
+def _seed(tags: int, params: int) -> None:
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(_SEED_TAGS, {"prefix": TAG_PREFIX, "tags": tags})
+            cur.execute(_SEED_PARAMS, {"params": params, "pattern": TAG_PREFIX + "%"})
+            cur.execute("ANALYZE tags")
+            cur.execute("ANALYZE params")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _cleanup() -> None:
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM tags WHERE tag LIKE %s", (TAG_PREFIX + "%",))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+async def _get(path: str, query: str, on_chunk) -> int:
+    """Call the app directly over ASGI, passing each body chunk to ``on_chunk``."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"benchmark")],
+        "client": ("127.0.0.1", 0),
+        "server": ("benchmark", 80),
+    }
+    requested = False
+    status = 0
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # No disconnect: wait until the response is done and this is cancelled
+        await asyncio.Future()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            on_chunk(message.get("body", b""))
+
+    await main.app(scope, receive, send)
+    return status
+
+
+async def _measure(path: str, limit: int, stream: bool) -> dict:
+    size = 0
+
+    def count(chunk: bytes) -> None:
+        nonlocal size
+        size += len(chunk)
+
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    status = await _get(path, f"limit={limit}&stream={str(stream).lower()}", count)
+    elapsed = time.perf_counter() - started
+    if status != 200:
+        raise RuntimeError(f"GET {path}?limit={limit}&stream={stream} returned {status}")
+    return {"bytes": size, "peak": tracemalloc.get_traced_memory()[1] - baseline, "ms": elapsed * 1000}
+
+
+async def _body(path: str, limit: int, stream: bool) -> bytes:
+    chunks: list[bytes] = []
+    await _get(path, f"limit={limit}&stream={str(stream).lower()}", chunks.append)
+    return b"".join(chunks)
+
+
+async def _run(path: str, limits: list[int]) -> tuple[list[tuple], list[int]]:
+    try:
+        # Warm up imports, the connection pool and the route before measuring
+        await _body(path, 10, True)
+        await _body(path, 10, False)
+
+        mismatched = [
+            limit for limit in limits
+            if json.loads(await _body(path, limit, True)) != json.loads(await _body(path, limit, False))
+        ]
+
+        tracemalloc.start()
+        try:
+            results = [
+                (limit, mode, await _measure(path, limit, mode == "streamed"))
+                for limit in limits
+                for mode in ("buffered", "streamed")
+            ]
+        finally:
+            tracemalloc.stop()
+    finally:
+        await dispose_engines()
+    return results, mismatched
+
+
+def main_cli(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare peak memory of buffered and streamed list responses.")
+    parser.add_argument("--path", choices=["/tags", "/params"], default="/tags", help="list route to request")
+    parser.add_argument("--limits", type=int, nargs="+", default=[1000, 10000], help="page sizes to request")
+    parser.add_argument("--params", type=int, default=4, help="params per seeded tag")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded tags")
+    args = parser.parse_args(argv)
+
+    # SQL echo would dominate both the runtime and the allocations measured
+    logging.disable(logging.CRITICAL)
+    _seed(max(args.limits), args.params)
+    try:
+        results, mismatched = asyncio.run(_run(args.path, sorted(args.limits)))
+    finally:
+        if not args.keep:
+            _cleanup()
+
+    print(f"GET {args.path}\n")
+    print(f"{'limit':>7} {'mode':<9} {'bytes':>11} {'peak MiB':>9} {'ms':>8}")
+    for limit, mode, r in results:
+        print(f"{limit:>7} {mode:<9} {r['bytes']:>11} {r['peak'] / 2**20:>9.1f} {r['ms']:>8.0f}")
+
+    peaks = {mode: [r["peak"] for _, m, r in results if m == mode] for mode in ("buffered", "streamed")}
+    print()
+    for mode, values in peaks.items():
+        print(f"{mode} peak at the largest limit is {values[-1] / values[0]:.1f}x the peak at the smallest")
+
+    if mismatched:
+        print(f"Streamed body differs from the buffered one for limit(s): {', '.join(map(str, mismatched))}")
+        return 1
+    print("Streamed bodies match the buffered ones")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
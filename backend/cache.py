@@ -0,0 +1,47 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+class TagCache:
+    """Thread-safe LRU cache with per-entry expiry.
+
+    Keys are tuples whose first element is the tag ID, so every entry for a
+    tag can be dropped at once when the tag changes.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: tuple, value: Any, ttl: float) -> None:
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_tag(self, tag_id: int) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == tag_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -1,8 +1,9 @@
+from sqlalchemy import ARRAY, String, and_, cast, delete, update
 from sqlalchemy.orm import Session
 from typing import Optional
 
 from db_models import TagModel, ParamModel
-from models import TagCreate, TagUpdate, ParamCreate, ParamUpdate
+from models import TagCreate, TagUpdate, TagFieldsUpdate, TagFilter, ParamCreate, ParamUpdate
 
 
 # ============== Tag CRUD ==============
@@ -22,6 +23,7 @@ def create_tag(db: Session, tag_data: TagCreate) -> TagModel:
         api_message=tag_data.api_message,
         query_active=tag_data.query_active,
         tag_active=tag_data.tag_active,
+        query_cache_ttl=tag_data.query_cache_ttl,
     )
     db.add(db_tag)
     db.flush()  # Get the tag ID
@@ -51,7 +53,12 @@ def get_tag(db: Session, tag_id: int) -> Optional[TagModel]:
 
 def get_all_tags(db: Session, skip: int = 0, limit: int = 100) -> list[TagModel]:
     """Get all tags with pagination."""
-    return db.query(TagModel).offset(skip).limit(limit).all()
+    return db.query(TagModel).order_by(TagModel.id).offset(skip).limit(limit).all()
+
+
+def get_tags_by_name(db: Session, name: str) -> list[TagModel]:
+    """Get all tags with the given name."""
+    return db.query(TagModel).filter(TagModel.tag == name).order_by(TagModel.id).all()
 
 
 def update_tag(db: Session, tag_id: int, tag_data: TagUpdate) -> Optional[TagModel]:
@@ -89,14 +96,123 @@ def update_tag(db: Session, tag_id: int, tag_data: TagUpdate) -> Optional[TagMod
 
 
 def delete_tag(db: Session, tag_id: int) -> bool:
-    """Delete a tag and all its parameters."""
-    db_tag = db.query(TagModel).filter(TagModel.id == tag_id).first()
-    if not db_tag:
-        return False
+    """Delete a tag; its parameters go with it via ON DELETE CASCADE."""
+    result = db.execute(delete(TagModel).where(TagModel.id == tag_id))
+    db.commit()
+    return result.rowcount > 0
+
+
+def tag_selection(ids: Optional[list[int]], tag_filter: Optional[TagFilter]):
+    """WHERE clause selecting tags by ID list and/or whitelisted filter fields."""
+    clauses = []
+    if ids:
+        clauses.append(TagModel.id.in_(ids))
+    if tag_filter:
+        for field, value in tag_filter.model_dump(exclude_none=True).items():
+            clauses.append(getattr(TagModel, field) == value)
+    return and_(*clauses)
+
+
+def get_tags_by_ids(db: Session, tag_ids: list[int]) -> list[TagModel]:
+    """Get several tags by ID, in ID order."""
+    return db.query(TagModel).filter(TagModel.id.in_(tag_ids)).order_by(TagModel.id).all()
+
 
-    db.delete(db_tag)
+def set_api_messages(db: Session, messages: dict[int, str]) -> None:
+    """Record the outcome of upstream API calls, keyed by tag ID."""
+    if not messages:
+        return
+    db.execute(update(TagModel), [{"id": tag_id, "api_message": m} for tag_id, m in messages.items()])
     db.commit()
-    return True
+
+
+def bulk_delete_tags(db: Session, ids: Optional[list[int]], tag_filter: Optional[TagFilter]) -> list[int]:
+    """Delete all selected tags in one statement. Returns the deleted IDs."""
+    result = db.execute(
+        delete(TagModel)
+        .where(tag_selection(ids, tag_filter))
+        .returning(TagModel.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = list(result.scalars())
+    db.commit()
+    return deleted
+
+
+def bulk_update_tags(
+    db: Session, ids: Optional[list[int]], tag_filter: Optional[TagFilter], values: TagFieldsUpdate
+) -> list[int]:
+    """Update all selected tags in one statement. Returns the updated IDs."""
+    update_data = values.model_dump(exclude_unset=True)
+    if not update_data:
+        return []
+    result = db.execute(
+        update(TagModel)
+        .where(tag_selection(ids, tag_filter))
+        .values(**update_data)
+        .returning(TagModel.id)
+        .execution_options(synchronize_session=False)
+    )
+    updated = list(result.scalars())
+    db.commit()
+    return updated
+
+
+# ============== Option Value Search ==============
+
+def option_filters(contains: list[str], overlaps: list[str], field_type: Optional[str], value_type: Optional[str]):
+    """Param conditions matching crud_v2._option_filters (cast so the GIN index applies)."""
+    clauses = []
+    if contains:
+        clauses.append(ParamModel.option_value.op("@>")(cast(contains, ARRAY(String))))
+    if overlaps:
+        clauses.append(ParamModel.option_value.op("&&")(cast(overlaps, ARRAY(String))))
+    if field_type is not None:
+        clauses.append(ParamModel.field_type == field_type)
+    if value_type is not None:
+        clauses.append(ParamModel.value_type == value_type)
+    return and_(*clauses)
+
+
+def search_params_by_options(
+    db: Session,
+    contains: list[str],
+    overlaps: list[str],
+    field_type: Optional[str] = None,
+    value_type: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> list[ParamModel]:
+    """Params whose option_value contains all of ``contains`` and any of ``overlaps``."""
+    return (
+        db.query(ParamModel)
+        .filter(option_filters(contains, overlaps, field_type, value_type))
+        .order_by(ParamModel.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+
+def search_tags_by_options(
+    db: Session,
+    contains: list[str],
+    overlaps: list[str],
+    field_type: Optional[str] = None,
+    value_type: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> list[TagModel]:
+    """Tags having at least one param that matches the option filters."""
+    matching = db.query(ParamModel.tag_id).filter(option_filters(contains, overlaps, field_type, value_type))
+    return (
+        db.query(TagModel)
+        .filter(TagModel.id.in_(matching))
+        .order_by(TagModel.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
 
 
 # ============== Param CRUD ==============
@@ -130,12 +246,12 @@ def get_param(db: Session, param_id: int) -> Optional[ParamModel]:
 
 def get_all_params(db: Session, skip: int = 0, limit: int = 100) -> list[ParamModel]:
     """Get all parameters with pagination."""
-    return db.query(ParamModel).offset(skip).limit(limit).all()
+    return db.query(ParamModel).order_by(ParamModel.id).offset(skip).limit(limit).all()
 
 
 def get_params_by_tag_id(db: Session, tag_id: int) -> list[ParamModel]:
     """Get all parameters for a specific tag."""
-    return db.query(ParamModel).filter(ParamModel.tag_id == tag_id).all()
+    return db.query(ParamModel).filter(ParamModel.tag_id == tag_id).order_by(ParamModel.id).all()
 
 
 def update_param(db: Session, param_id: int, param_data: ParamUpdate) -> Optional[ParamModel]:
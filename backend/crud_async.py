@@ -0,0 +1,238 @@
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import AsyncIterator, Optional
+
+from db_models import TagModel, ParamModel
+from crud import tag_selection
+from models import TagCreate, TagUpdate, TagFieldsUpdate, TagFilter, ParamCreate, ParamUpdate
+
+
+# Async counterparts of crud.py. Relationships are loaded eagerly with
+# selectinload: implicit lazy loads are not possible under AsyncSession.
+
+
+def _param_model(tag_id: int, param_data: ParamCreate) -> ParamModel:
+    return ParamModel(
+        tag_id=tag_id,
+        db_column=param_data.db_column,
+        display_name=param_data.display_name,
+        option_value=param_data.option_value,
+        field_type=param_data.field_type,
+        value_type=param_data.value_type,
+        api_param=param_data.api_param,
+    )
+
+
+# ============== Tag CRUD ==============
+
+async def create_tag(db: AsyncSession, tag_data: TagCreate) -> TagModel:
+    """Create a new tag with its parameters."""
+    db_tag = TagModel(
+        tag=tag_data.tag,
+        query=tag_data.query,
+        comment=tag_data.comment,
+        dynamic_param_source=tag_data.dynamic_param_source,
+        api_active=tag_data.api_active,
+        api_endpoint=tag_data.api_endpoint,
+        api_name=tag_data.api_name,
+        api_at_get_data=tag_data.api_at_get_data,
+        api_message=tag_data.api_message,
+        query_active=tag_data.query_active,
+        tag_active=tag_data.tag_active,
+        query_cache_ttl=tag_data.query_cache_ttl,
+    )
+    db.add(db_tag)
+    await db.flush()  # Get the tag ID
+
+    for param_data in tag_data.params:
+        db.add(_param_model(db_tag.id, param_data))
+
+    await db.commit()
+    await db.refresh(db_tag, ["params"])
+    return db_tag
+
+
+async def get_tag(db: AsyncSession, tag_id: int) -> Optional[TagModel]:
+    """Get a tag by ID."""
+    result = await db.execute(
+        select(TagModel).options(selectinload(TagModel.params)).where(TagModel.id == tag_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def get_all_tags(db: AsyncSession, skip: int = 0, limit: int = 100) -> list[TagModel]:
+    """Get all tags with pagination."""
+    result = await db.execute(
+        select(TagModel)
+        .options(selectinload(TagModel.params))
+        .order_by(TagModel.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+async def get_tags_by_name(db: AsyncSession, name: str) -> list[TagModel]:
+    """Get all tags with the given name."""
+    result = await db.execute(
+        select(TagModel)
+        .options(selectinload(TagModel.params))
+        .where(TagModel.tag == name)
+        .order_by(TagModel.id)
+    )
+    return list(result.scalars().all())
+
+
+def _expunge(db: AsyncSession, batch: list) -> None:
+    # expunge_all() would replace the identity map the open result still loads into
+    for obj in batch:
+        db.expunge(obj)
+
+
+async def iter_all_tags(
+    db: AsyncSession, skip: int = 0, limit: int = 100, batch_size: int = 500
+) -> AsyncIterator[list[TagModel]]:
+    """Stream tags in batches from a server-side cursor.
+
+    Each batch is expunged once the caller has consumed it, so memory use is
+    bounded by ``batch_size`` rather than ``limit``.
+    """
+    result = await db.stream(
+        select(TagModel)
+        .options(selectinload(TagModel.params))
+        .order_by(TagModel.id)
+        .offset(skip)
+        .limit(limit)
+        .execution_options(yield_per=batch_size)
+    )
+    async for batch in result.scalars().partitions():
+        yield batch
+        _expunge(db, batch)
+
+
+async def update_tag(db: AsyncSession, tag_id: int, tag_data: TagUpdate) -> Optional[TagModel]:
+    """Update an existing tag."""
+    db_tag = await get_tag(db, tag_id)
+    if not db_tag:
+        return None
+
+    update_data = tag_data.model_dump(exclude_unset=True, exclude={"params"})
+    for field, value in update_data.items():
+        setattr(db_tag, field, value)
+
+    if tag_data.params is not None:
+        await db.execute(delete(ParamModel).where(ParamModel.tag_id == tag_id))
+        for param_data in tag_data.params:
+            db.add(_param_model(tag_id, param_data))
+
+    await db.commit()
+    await db.refresh(db_tag, ["params"])
+    return db_tag
+
+
+async def delete_tag(db: AsyncSession, tag_id: int) -> bool:
+    """Delete a tag; its parameters go with it via ON DELETE CASCADE."""
+    result = await db.execute(delete(TagModel).where(TagModel.id == tag_id))
+    await db.commit()
+    return result.rowcount > 0
+
+
+async def bulk_delete_tags(db: AsyncSession, ids: Optional[list[int]], tag_filter: Optional[TagFilter]) -> int:
+    """Delete all selected tags in one statement. Returns the number deleted."""
+    result = await db.execute(
+        delete(TagModel).where(tag_selection(ids, tag_filter)).execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def bulk_update_tags(
+    db: AsyncSession, ids: Optional[list[int]], tag_filter: Optional[TagFilter], values: TagFieldsUpdate
+) -> int:
+    """Update all selected tags in one statement. Returns the number updated."""
+    update_data = values.model_dump(exclude_unset=True)
+    if not update_data:
+        return 0
+    result = await db.execute(
+        update(TagModel)
+        .where(tag_selection(ids, tag_filter))
+        .values(**update_data)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+# ============== Param CRUD ==============
+
+async def create_param(db: AsyncSession, tag_id: int, param_data: ParamCreate) -> Optional[ParamModel]:
+    """Create a new parameter for a tag."""
+    tag = await db.get(TagModel, tag_id)
+    if not tag:
+        return None
+
+    db_param = _param_model(tag_id, param_data)
+    db.add(db_param)
+    await db.commit()
+    await db.refresh(db_param)
+    return db_param
+
+
+async def get_param(db: AsyncSession, param_id: int) -> Optional[ParamModel]:
+    """Get a parameter by ID."""
+    return await db.get(ParamModel, param_id)
+
+
+async def get_all_params(db: AsyncSession, skip: int = 0, limit: int = 100) -> list[ParamModel]:
+    """Get all parameters with pagination."""
+    result = await db.execute(select(ParamModel).order_by(ParamModel.id).offset(skip).limit(limit))
+    return list(result.scalars().all())
+
+
+async def iter_all_params(
+    db: AsyncSession, skip: int = 0, limit: int = 100, batch_size: int = 500
+) -> AsyncIterator[list[ParamModel]]:
+    """Stream parameters in batches from a server-side cursor."""
+    result = await db.stream(
+        select(ParamModel)
+        .order_by(ParamModel.id)
+        .offset(skip)
+        .limit(limit)
+        .execution_options(yield_per=batch_size)
+    )
+    async for batch in result.scalars().partitions():
+        yield batch
+        _expunge(db, batch)
+
+
+async def get_params_by_tag_id(db: AsyncSession, tag_id: int) -> list[ParamModel]:
+    """Get all parameters for a specific tag."""
+    result = await db.execute(select(ParamModel).where(ParamModel.tag_id == tag_id).order_by(ParamModel.id))
+    return list(result.scalars().all())
+
+
+async def update_param(db: AsyncSession, param_id: int, param_data: ParamUpdate) -> Optional[ParamModel]:
+    """Update an existing parameter."""
+    db_param = await db.get(ParamModel, param_id)
+    if not db_param:
+        return None
+
+    update_data = param_data.model_dump(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(db_param, field, value)
+
+    await db.commit()
+    await db.refresh(db_param)
+    return db_param
+
+
+async def delete_param(db: AsyncSession, param_id: int) -> bool:
+    """Delete a parameter."""
+    db_param = await db.get(ParamModel, param_id)
+    if not db_param:
+        return False
+
+    await db.delete(db_param)
+    await db.commit()
+    return True
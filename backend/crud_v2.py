@@ -1,7 +1,17 @@
 import json
 import psycopg2
 import psycopg2.extras
-from config import DATABASE_URL
+from config import DATABASE_URL, QUERY_DATABASE_URL
+
+
+TAG_FIELDS = {
+    "tag", "query", "comment", "dynamic_param_source",
+    "api_active", "api_endpoint", "api_name", "api_at_get_data",
+    "api_message", "query_active", "tag_active", "query_cache_ttl",
+}
+
+# Fields bulk operations may select tags by
+TAG_FILTER_FIELDS = {"tag", "tag_active", "query_active", "api_active", "api_at_get_data"}
 
 
 def get_connection():
@@ -9,6 +19,11 @@ def get_connection():
     return psycopg2.connect(DATABASE_URL)
 
 
+def get_query_connection():
+    """Get a connection for running stored tag queries, from QUERY_DATABASE_URL."""
+    return psycopg2.connect(QUERY_DATABASE_URL)
+
+
 def _row_to_tag(row):
     """Convert a database row to a tag dict."""
     return {
@@ -24,6 +39,7 @@ def _row_to_tag(row):
         "api_message": row["api_message"],
         "query_active": row["query_active"],
         "tag_active": row["tag_active"],
+        "query_cache_ttl": row["query_cache_ttl"],
     }
 
 
@@ -47,6 +63,34 @@ def _fetch_params_for_tag(cur, tag_id):
     return [_row_to_param(r) for r in cur.fetchall()]
 
 
+def _insert_params(cur, tag_id, params):
+    """Insert a tag's params in a single statement."""
+    if not params:
+        return
+    psycopg2.extras.execute_values(
+        cur,
+        """
+        INSERT INTO params (tag_id, db_column, display_name,
+            option_value, field_type, value_type, api_param)
+        VALUES %s
+        """,
+        [
+            (
+                tag_id,
+                param["db_column"],
+                param["display_name"],
+                param.get("option_value", []),
+                param.get("field_type", "text"),
+                param.get("value_type", "string"),
+                param.get("api_param", False),
+            )
+            for param in params
+        ],
+        template="(%s, %s, %s, %s::varchar[], %s, %s, %s)",
+        page_size=len(params),
+    )
+
+
 # ============== Tag CRUD ==============
 
 def create_tag(tag_data: dict) -> dict:
@@ -57,8 +101,8 @@ def create_tag(tag_data: dict) -> dict:
                 """
                 INSERT INTO tags (tag, query, comment, dynamic_param_source,
                     api_active, api_endpoint, api_name, api_at_get_data,
-                    api_message, query_active, tag_active)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    api_message, query_active, tag_active, query_cache_ttl)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 RETURNING id
                 """,
                 (
@@ -73,27 +117,12 @@ def create_tag(tag_data: dict) -> dict:
                     tag_data.get("api_message", ""),
                     tag_data.get("query_active", True),
                     tag_data.get("tag_active", True),
+                    tag_data.get("query_cache_ttl", 0),
                 ),
             )
             tag_id = cur.fetchone()["id"]
 
-            for param in tag_data.get("params", []):
-                cur.execute(
-                    """
-                    INSERT INTO params (tag_id, db_column, display_name,
-                        option_value, field_type, value_type, api_param)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    """,
-                    (
-                        tag_id,
-                        param["db_column"],
-                        param["display_name"],
-                        param.get("option_value", []),
-                        param.get("field_type", "text"),
-                        param.get("value_type", "string"),
-                        param.get("api_param", False),
-                    ),
-                )
+            _insert_params(cur, tag_id, tag_data.get("params", []))
 
             conn.commit()
             return {"id": tag_id}
@@ -132,6 +161,19 @@ def get_all_tags(skip: int = 0, limit: int = 100) -> list[dict]:
         conn.close()
 
 
+def get_tags_by_name(name: str) -> list[dict]:
+    conn = get_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute("SELECT * FROM tags WHERE tag = %s ORDER BY id", (name,))
+            tags = [_row_to_tag(r) for r in cur.fetchall()]
+            for tag in tags:
+                tag["params"] = _fetch_params_for_tag(cur, tag["id"])
+            return tags
+    finally:
+        conn.close()
+
+
 def update_tag(tag_id: int, tag_data: dict) -> dict | None:
     conn = get_connection()
     try:
@@ -141,12 +183,7 @@ def update_tag(tag_id: int, tag_data: dict) -> dict | None:
                 return None
 
             # Build SET clause dynamically for provided fields
-            allowed_fields = {
-                "tag", "query", "comment", "dynamic_param_source",
-                "api_active", "api_endpoint", "api_name", "api_at_get_data",
-                "api_message", "query_active", "tag_active",
-            }
-            updates = {k: v for k, v in tag_data.items() if k in allowed_fields and v is not None}
+            updates = {k: v for k, v in tag_data.items() if k in TAG_FIELDS and v is not None}
 
             if updates:
                 set_clause = ", ".join(f"{k} = %s" for k in updates)
@@ -158,23 +195,7 @@ def update_tag(tag_id: int, tag_data: dict) -> dict | None:
             # Replace params if provided
             if "params" in tag_data and tag_data["params"] is not None:
                 cur.execute("DELETE FROM params WHERE tag_id = %s", (tag_id,))
-                for param in tag_data["params"]:
-                    cur.execute(
-                        """
-                        INSERT INTO params (tag_id, db_column, display_name,
-                            option_value, field_type, value_type, api_param)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s)
-                        """,
-                        (
-                            tag_id,
-                            param["db_column"],
-                            param["display_name"],
-                            param.get("option_value", []),
-                            param.get("field_type", "text"),
-                            param.get("value_type", "string"),
-                            param.get("api_param", False),
-                        ),
-                    )
+                _insert_params(cur, tag_id, tag_data["params"])
 
             conn.commit()
             return {"id": tag_id}
@@ -200,6 +221,201 @@ def delete_tag(tag_id: int) -> bool:
         conn.close()
 
 
+def _tag_selection(ids: list[int] | None, filters: dict | None):
+    """Build a WHERE clause selecting tags by ID list and/or whitelisted filter fields."""
+    clauses, values = [], []
+    if ids is not None and (not isinstance(ids, list) or not all(isinstance(i, int) for i in ids)):
+        raise ValueError("'ids' must be a list of integers")
+    if ids:
+        clauses.append("id = ANY(%s)")
+        values.append(list(ids))
+    if filters is not None and not isinstance(filters, dict):
+        raise ValueError("'filter' must be an object")
+    for field, value in (filters or {}).items():
+        if field not in TAG_FILTER_FIELDS:
+            raise ValueError(f"Cannot filter tags by '{field}'")
+        clauses.append(f"{field} = %s")
+        values.append(value)
+    if not clauses:
+        raise ValueError("Provide a non-empty 'ids' list or at least one 'filter' field")
+    return " AND ".join(clauses), values
+
+
+def bulk_delete_tags(ids: list[int] | None, filters: dict | None) -> list[int]:
+    """Delete all selected tags (params cascade) in one statement. Returns the deleted IDs."""
+    where, values = _tag_selection(ids, filters)
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"DELETE FROM tags WHERE {where} RETURNING id", values)
+            deleted = [r[0] for r in cur.fetchall()]
+            conn.commit()
+            return deleted
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def bulk_update_tags(ids: list[int] | None, filters: dict | None, values: dict) -> list[int]:
+    """Update all selected tags in one statement. Returns the updated IDs."""
+    where, where_values = _tag_selection(ids, filters)
+    updates = {k: v for k, v in values.items() if k in TAG_FIELDS and v is not None}
+    if not updates:
+        raise ValueError("'values' must set at least one tag field")
+
+    set_clause = ", ".join(f"{k} = %s" for k in updates)
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"UPDATE tags SET {set_clause} WHERE {where} RETURNING id",
+                (*updates.values(), *where_values),
+            )
+            updated = [r[0] for r in cur.fetchall()]
+            conn.commit()
+            return updated
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+# ============== Tag Documents ==============
+
+def get_tag_document(tag_id: int) -> dict | None:
+    """Read a pre-rendered tag from tag_documents."""
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT document FROM tag_documents WHERE tag_id = %s", (tag_id,))
+            row = cur.fetchone()
+            return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def get_all_tag_documents(skip: int = 0, limit: int = 100) -> list[dict]:
+    """Read a page of pre-rendered tags from tag_documents."""
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT document FROM tag_documents ORDER BY tag_id OFFSET %s LIMIT %s",
+                (skip, limit),
+            )
+            return [r[0] for r in cur.fetchall()]
+    finally:
+        conn.close()
+
+
+def set_api_messages(messages: dict[int, str]) -> None:
+    """Record the outcome of upstream API calls, keyed by tag ID."""
+    if not messages:
+        return
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            psycopg2.extras.execute_values(
+                cur,
+                "UPDATE tags SET api_message = v.message FROM (VALUES %s) AS v(id, message) WHERE tags.id = v.id",
+                list(messages.items()),
+            )
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def get_tags_by_ids(tag_ids: list[int]) -> list[dict]:
+    """Get several tags (with params) by ID, in ID order."""
+    conn = get_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute("SELECT * FROM tags WHERE id = ANY(%s) ORDER BY id", (list(tag_ids),))
+            tags = [_row_to_tag(r) for r in cur.fetchall()]
+            for tag in tags:
+                tag["params"] = _fetch_params_for_tag(cur, tag["id"])
+            return tags
+    finally:
+        conn.close()
+
+
+# ============== Option Value Search ==============
+
+def _option_filters(contains: list[str], overlaps: list[str], field_type: str | None, value_type: str | None):
+    """Build a WHERE clause over params that can use the option_value GIN index."""
+    clauses, values = [], []
+    if contains:
+        clauses.append("p.option_value @> %s::varchar[]")
+        values.append(contains)
+    if overlaps:
+        clauses.append("p.option_value && %s::varchar[]")
+        values.append(overlaps)
+    if field_type is not None:
+        clauses.append("p.field_type = %s")
+        values.append(field_type)
+    if value_type is not None:
+        clauses.append("p.value_type = %s")
+        values.append(value_type)
+    return " AND ".join(clauses) or "TRUE", values
+
+
+def search_params_by_options(
+    contains: list[str],
+    overlaps: list[str],
+    field_type: str | None = None,
+    value_type: str | None = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> list[dict]:
+    """Params whose option_value contains all of ``contains`` and any of ``overlaps``."""
+    where, values = _option_filters(contains, overlaps, field_type, value_type)
+    conn = get_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(
+                f"SELECT p.* FROM params p WHERE {where} ORDER BY p.id OFFSET %s LIMIT %s",
+                (*values, skip, limit),
+            )
+            return [_row_to_param(r) for r in cur.fetchall()]
+    finally:
+        conn.close()
+
+
+def search_tags_by_options(
+    contains: list[str],
+    overlaps: list[str],
+    field_type: str | None = None,
+    value_type: str | None = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> list[dict]:
+    """Tags having at least one param that matches the option filters."""
+    where, values = _option_filters(contains, overlaps, field_type, value_type)
+    conn = get_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(
+                f"""
+                SELECT t.* FROM tags t
+                WHERE t.id IN (SELECT p.tag_id FROM params p WHERE {where})
+                ORDER BY t.id OFFSET %s LIMIT %s
+                """,
+                (*values, skip, limit),
+            )
+            tags = [_row_to_tag(r) for r in cur.fetchall()]
+            for tag in tags:
+                tag["params"] = _fetch_params_for_tag(cur, tag["id"])
+            return tags
+    finally:
+        conn.close()
+
+
 # ============== Param CRUD ==============
 
 def create_param(tag_id: int, param_data: dict) -> dict | None:
@@ -1,26 +1,62 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from sqlalchemy.engine import Engine
+from typing import AsyncGenerator, Generator
 
-from config import DATABASE_URL
-from db_models import Base
+from config import ASYNC_DATABASE_URL, DATABASE_URL
 
-# Create engine
-engine = create_engine(DATABASE_URL, echo=True)
+# Engines are created on first use rather than at import, keeping startup
+# (and tools that only import models) free of connection-pool setup.
+_engine: Engine | None = None
+_async_engine: AsyncEngine | None = None
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Session factories; bound to their engines on first use
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
+# Objects stay loaded after commit so that async handlers never trigger
+# implicit (unsupported) lazy loads.
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
 
-def create_tables():
-    """Create all database tables."""
-    Base.metadata.create_all(bind=engine)
+
+def get_engine() -> Engine:
+    """Return the sync engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(DATABASE_URL, echo=True)
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def get_async_engine() -> AsyncEngine:
+    """Return the async engine, creating it on first use."""
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=True)
+        AsyncSessionLocal.configure(bind=_async_engine)
+    return _async_engine
+
+
+async def dispose_engines() -> None:
+    """Close the connection pools of any engines that were created."""
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _engine is not None:
+        _engine.dispose()
 
 
 def get_db() -> Generator[Session, None, None]:
     """Dependency to get database session."""
+    get_engine()
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency to get an async database session."""
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, Text, ForeignKey, ARRAY
+from sqlalchemy import Column, Integer, String, Boolean, Text, ForeignKey, ARRAY, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship, DeclarativeBase
 
 
@@ -21,16 +22,27 @@ class TagModel(Base):
     api_message = Column(Text, default="")
     query_active = Column(Boolean, default=True)
     tag_active = Column(Boolean, default=True)
+    query_cache_ttl = Column(Integer, default=0)
 
     # Relationship to params
-    params = relationship("ParamModel", back_populates="tag", cascade="all, delete-orphan")
+    params = relationship(
+        "ParamModel",
+        back_populates="tag",
+        order_by="ParamModel.id",
+        cascade="all, delete-orphan",
+        passive_deletes=True,  # rely on ON DELETE CASCADE instead of loading params
+    )
 
 
 class ParamModel(Base):
     __tablename__ = "params"
+    __table_args__ = (
+        # Serves option_value containment (@>) and overlap (&&) queries
+        Index("ix_params_option_value", "option_value", postgresql_using="gin"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), nullable=False)
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), nullable=False, index=True)
     db_column = Column(String(100), nullable=False)
     display_name = Column(String(200), nullable=False)
     option_value = Column(ARRAY(String), default=[])
@@ -40,3 +52,11 @@ class ParamModel(Base):
 
     # Relationship to tag
     tag = relationship("TagModel", back_populates="params")
+
+
+class TagDocumentModel(Base):
+    __tablename__ = "tag_documents"
+
+    # One pre-rendered JSON document per tag, kept in sync by triggers
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+    document = Column(JSONB, nullable=False)
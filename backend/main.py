@@ -1,6 +1,15 @@
-from fastapi import FastAPI, HTTPException, status, Depends
+import time
+
+_import_started = time.perf_counter()
+
+import logging
+
+from fastapi import FastAPI, HTTPException, Request, status, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from models import (
     Tag,
@@ -11,17 +20,31 @@ from models import (
     ParamCreate,
     ParamUpdate,
     ParamResponse,
+    TagSelection,
+    TagBulkUpdate,
+    BulkResponse,
 )
-from database import get_db, create_tables
-import crud
+from admission import AdmissionMiddleware
+import admission
+from config import COMPRESS_MIN_SIZE, STORAGE_BACKEND, STREAM_BATCH_SIZE
+from database import AsyncSessionLocal, dispose_engines, get_async_db, get_async_engine
+import crud_async
+import negotiation
+import tag_api
 from routes_v2 import router as v2_router
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(
     title="Tag Management API",
     description="CRUD API for managing Tags and Parameters with PostgreSQL",
     version="1.0.0",
 )
 
+# Admission control in front of all DB-bound routes. Added before CORS so that
+# CORS wraps it and 503 rejections still carry CORS headers.
+app.add_middleware(AdmissionMiddleware)
+
 # CORS middleware for frontend integration
 app.add_middleware(
     CORSMiddleware,
@@ -31,23 +54,64 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress responses above COMPRESS_MIN_SIZE bytes for clients sending Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_SIZE)
+
 
 # Register v2 router (raw SQL, no ORM)
 app.include_router(v2_router)
 
 
+# Filled in by on_startup; served at /metrics/startup
+startup_report: dict = {"import_ms": round((time.perf_counter() - _import_started) * 1000, 2)}
+
+
 @app.on_event("startup")
 def on_startup():
-    """Create database tables on startup."""
-    create_tables()
+    """Check (and if allowed, migrate) the schema version; see migrations.py."""
+    started = time.perf_counter()
+    if STORAGE_BACKEND != "memory":
+        import migrations
+
+        startup_report["schema"] = migrations.ensure_schema()
+    startup_report["startup_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    logger.info("Startup completed: %s", startup_report)
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    """Close the pooled upstream HTTP client and database pools."""
+    await tag_api.close_client()
+    await dispose_engines()
+
+
+def _stream_json_array(iter_batches, schema: type[BaseModel], skip: int, limit: int) -> StreamingResponse:
+    """Serialize rows from ``iter_batches`` into a JSON array as they are fetched.
+
+    The stream opens its own session: request-scoped dependencies are closed
+    before a streaming body is sent.
+    """
+    async def body():
+        get_async_engine()
+        async with AsyncSessionLocal() as db:
+            yield b"["
+            first = True
+            async for batch in iter_batches(db, skip=skip, limit=limit, batch_size=STREAM_BATCH_SIZE):
+                chunk = b",".join(schema.model_validate(row).model_dump_json().encode() for row in batch)
+                if chunk:
+                    yield chunk if first else b"," + chunk
+                    first = False
+            yield b"]"
+
+    return StreamingResponse(body(), media_type="application/json")
 
 
 # ============== Tag Endpoints ==============
 
 @app.post("/tags", response_model=TagResponse, status_code=status.HTTP_201_CREATED)
-def create_tag(tag_data: TagCreate, db: Session = Depends(get_db)):
+async def create_tag(tag_data: TagCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new tag with optional parameters."""
-    tag = crud.create_tag(db, tag_data)
+    tag = await crud_async.create_tag(db, tag_data)
 
     return TagResponse(
         success=True,
@@ -57,28 +121,61 @@ def create_tag(tag_data: TagCreate, db: Session = Depends(get_db)):
 
 
 @app.get("/tags", response_model=list[Tag])
-def get_all_tags(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all tags with their parameters."""
-    tags = crud.get_all_tags(db, skip=skip, limit=limit)
+async def get_all_tags(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    stream: bool = False,
+    layout: str = "rows",
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get all tags with their parameters.
+
+    With ``stream=true`` the JSON array is written incrementally. MessagePack
+    (``Accept: application/msgpack``) and ``layout=columnar`` are encoded in one piece.
+    """
+    negotiation.check_layout(layout)
+    negotiated = layout != "rows" or negotiation.wants_msgpack(request)
+    if stream and not negotiated:
+        return _stream_json_array(crud_async.iter_all_tags, Tag, skip, limit)
+    tags = await crud_async.get_all_tags(db, skip=skip, limit=limit)
+    if negotiated:
+        return negotiation.render(request, [Tag.model_validate(t).model_dump() for t in tags], layout)
     return tags
 
 
+@app.delete("/tags", response_model=BulkResponse)
+async def bulk_delete_tags(selection: TagSelection, db: AsyncSession = Depends(get_async_db)):
+    """Delete every tag matching an ID list and/or filter in a single statement."""
+    affected = await crud_async.bulk_delete_tags(db, selection.ids, selection.filter)
+    return BulkResponse(success=True, affected=affected, message=f"Deleted {affected} tag(s)")
+
+
+@app.patch("/tags", response_model=BulkResponse)
+async def bulk_update_tags(bulk: TagBulkUpdate, db: AsyncSession = Depends(get_async_db)):
+    """Update every tag matching an ID list and/or filter in a single statement."""
+    affected = await crud_async.bulk_update_tags(db, bulk.ids, bulk.filter, bulk.values)
+    return BulkResponse(success=True, affected=affected, message=f"Updated {affected} tag(s)")
+
+
 @app.get("/tags/{tag_id}", response_model=Tag)
-def get_tag(tag_id: int, db: Session = Depends(get_db)):
+async def get_tag(request: Request, tag_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific tag by ID."""
-    tag = crud.get_tag(db, tag_id)
+    tag = await crud_async.get_tag(db, tag_id)
     if not tag:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Tag with ID {tag_id} not found",
         )
+    if negotiation.wants_msgpack(request):
+        return negotiation.render(request, Tag.model_validate(tag).model_dump())
     return tag
 
 
 @app.put("/tags/{tag_id}", response_model=TagResponse)
-def update_tag(tag_id: int, tag_data: TagUpdate, db: Session = Depends(get_db)):
+async def update_tag(tag_id: int, tag_data: TagUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update an existing tag."""
-    tag = crud.update_tag(db, tag_id, tag_data)
+    tag = await crud_async.update_tag(db, tag_id, tag_data)
     if not tag:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -93,9 +190,9 @@ def update_tag(tag_id: int, tag_data: TagUpdate, db: Session = Depends(get_db)):
 
 
 @app.delete("/tags/{tag_id}", response_model=TagResponse)
-def delete_tag(tag_id: int, db: Session = Depends(get_db)):
+async def delete_tag(tag_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a tag and all its parameters."""
-    if not crud.delete_tag(db, tag_id):
+    if not await crud_async.delete_tag(db, tag_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Tag with ID {tag_id} not found",
@@ -111,9 +208,9 @@ def delete_tag(tag_id: int, db: Session = Depends(get_db)):
 # ============== Param Endpoints ==============
 
 @app.post("/tags/{tag_id}/params", response_model=ParamResponse, status_code=status.HTTP_201_CREATED)
-def create_param(tag_id: int, param_data: ParamCreate, db: Session = Depends(get_db)):
+async def create_param(tag_id: int, param_data: ParamCreate, db: AsyncSession = Depends(get_async_db)):
     """Add a new parameter to an existing tag."""
-    param = crud.create_param(db, tag_id, param_data)
+    param = await crud_async.create_param(db, tag_id, param_data)
     if not param:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -128,28 +225,30 @@ def create_param(tag_id: int, param_data: ParamCreate, db: Session = Depends(get
 
 
 @app.get("/params", response_model=list[Param])
-def get_all_params(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all parameters across all tags."""
-    return crud.get_all_params(db, skip=skip, limit=limit)
+async def get_all_params(skip: int = 0, limit: int = 100, stream: bool = False, db: AsyncSession = Depends(get_async_db)):
+    """Get all parameters across all tags. With ``stream=true`` the array is written incrementally."""
+    if stream:
+        return _stream_json_array(crud_async.iter_all_params, Param, skip, limit)
+    return await crud_async.get_all_params(db, skip=skip, limit=limit)
 
 
 @app.get("/tags/{tag_id}/params", response_model=list[Param])
-def get_params_by_tag(tag_id: int, db: Session = Depends(get_db)):
+async def get_params_by_tag(tag_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get all parameters for a specific tag."""
-    tag = crud.get_tag(db, tag_id)
+    tag = await crud_async.get_tag(db, tag_id)
     if not tag:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Tag with ID {tag_id} not found",
         )
 
-    return crud.get_params_by_tag_id(db, tag_id)
+    return await crud_async.get_params_by_tag_id(db, tag_id)
 
 
 @app.get("/params/{param_id}", response_model=Param)
-def get_param(param_id: int, db: Session = Depends(get_db)):
+async def get_param(param_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific parameter by ID."""
-    param = crud.get_param(db, param_id)
+    param = await crud_async.get_param(db, param_id)
     if not param:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -159,9 +258,9 @@ def get_param(param_id: int, db: Session = Depends(get_db)):
 
 
 @app.put("/params/{param_id}", response_model=ParamResponse)
-def update_param(param_id: int, param_data: ParamUpdate, db: Session = Depends(get_db)):
+async def update_param(param_id: int, param_data: ParamUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update an existing parameter."""
-    param = crud.update_param(db, param_id, param_data)
+    param = await crud_async.update_param(db, param_id, param_data)
     if not param:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -176,9 +275,9 @@ def update_param(param_id: int, param_data: ParamUpdate, db: Session = Depends(g
 
 
 @app.delete("/params/{param_id}", response_model=ParamResponse)
-def delete_param(param_id: int, db: Session = Depends(get_db)):
+async def delete_param(param_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a parameter."""
-    if not crud.delete_param(db, param_id):
+    if not await crud_async.delete_param(db, param_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Parameter with ID {param_id} not found",
@@ -199,6 +298,18 @@ def health_check():
     return {"status": "healthy", "message": "API is running"}
 
 
+@app.get("/metrics/startup")
+def startup_metrics():
+    """Import and startup durations, and what the schema check did."""
+    return startup_report
+
+
+@app.get("/metrics/admission")
+def admission_metrics():
+    """Admission control load and queue-time metrics."""
+    return admission.controller.snapshot()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
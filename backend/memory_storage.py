@@ -0,0 +1,247 @@
+"""In-process storage backend.
+
+Keeps tags and params in dicts indexed by ID, tags additionally indexed by
+``tag`` name and params by ``tag_id``. Semantics follow crud_v2.py: the same
+defaults, ID-ordered pagination, params replaced on tag update, params
+deleted together with their tag, and the same bulk selection and option
+search rules. Returned dicts are copies, so callers can never mutate stored
+state.
+"""
+import copy
+import threading
+from collections import defaultdict
+from itertools import islice
+
+from storage import Storage
+
+TAG_DEFAULTS = {
+    "query": "",
+    "comment": "",
+    "dynamic_param_source": "",
+    "api_active": False,
+    "api_endpoint": "",
+    "api_name": "",
+    "api_at_get_data": False,
+    "api_message": "",
+    "query_active": True,
+    "tag_active": True,
+    "query_cache_ttl": 0,
+}
+
+# Fields bulk operations may select tags by (crud_v2.TAG_FILTER_FIELDS)
+FILTER_FIELDS = {"tag", "tag_active", "query_active", "api_active", "api_at_get_data"}
+
+PARAM_DEFAULTS = {
+    "option_value": [],
+    "field_type": "text",
+    "value_type": "string",
+    "api_param": False,
+}
+
+
+class MemoryStorage(Storage):
+    def __init__(self):
+        self._lock = threading.RLock()
+        # IDs are assigned in increasing order, so dict insertion order is ID order
+        self._tags: dict[int, dict] = {}
+        self._params: dict[int, dict] = {}
+        self._tag_ids_by_name: dict[str, set[int]] = defaultdict(set)
+        self._param_ids_by_tag: dict[int, list[int]] = defaultdict(list)
+        self._next_tag_id = 1
+        self._next_param_id = 1
+
+    # ============== Internals ==============
+
+    def _insert_param(self, tag_id: int, param_data: dict) -> int:
+        param_id = self._next_param_id
+        self._next_param_id += 1
+        param = {
+            "id": param_id,
+            "tag_id": tag_id,
+            "db_column": param_data["db_column"],
+            "display_name": param_data["display_name"],
+        }
+        for field, default in PARAM_DEFAULTS.items():
+            param[field] = param_data.get(field, default)
+        param["option_value"] = list(param["option_value"] or [])
+        self._params[param_id] = param
+        # IDs only ever increase, so appending keeps the index sorted
+        self._param_ids_by_tag[tag_id].append(param_id)
+        return param_id
+
+    def _remove_params_of(self, tag_id: int) -> None:
+        for param_id in self._param_ids_by_tag.pop(tag_id, []):
+            del self._params[param_id]
+
+    def _render_tag(self, tag_id: int) -> dict:
+        tag = dict(self._tags[tag_id])
+        tag["params"] = self._render_params_of(tag_id)
+        return tag
+
+    def _render_params_of(self, tag_id: int) -> list[dict]:
+        return [copy.deepcopy(self._params[p]) for p in self._param_ids_by_tag.get(tag_id, [])]
+
+    def _select_tags(self, ids: list[int] | None, filters: dict | None) -> list[int]:
+        """IDs of the tags matching an ID list and/or field equality, like crud_v2._tag_selection."""
+        filters = filters or {}
+        unknown = set(filters) - FILTER_FIELDS
+        if unknown:
+            raise ValueError(f"Cannot filter tags by '{sorted(unknown)[0]}'")
+        if not ids and not filters:
+            raise ValueError("Provide a non-empty 'ids' list or at least one 'filter' field")
+        candidates = sorted(set(ids) & self._tags.keys()) if ids else list(self._tags)
+        return [
+            t for t in candidates
+            if all(self._tags[t][field] == value for field, value in filters.items())
+        ]
+
+    def _option_matches(
+        self, param: dict, contains: list[str], overlaps: list[str], field_type: str | None, value_type: str | None
+    ) -> bool:
+        options = set(param["option_value"])
+        return (
+            options.issuperset(contains)
+            and (not overlaps or not options.isdisjoint(overlaps))
+            and (field_type is None or param["field_type"] == field_type)
+            and (value_type is None or param["value_type"] == value_type)
+        )
+
+    # ============== Tags ==============
+
+    def create_tag(self, tag_data):
+        with self._lock:
+            tag_id = self._next_tag_id
+            self._next_tag_id += 1
+            tag = {"id": tag_id, "tag": tag_data["tag"]}
+            for field, default in TAG_DEFAULTS.items():
+                tag[field] = tag_data.get(field, default)
+            self._tags[tag_id] = tag
+            self._tag_ids_by_name[tag["tag"]].add(tag_id)
+            for param_data in tag_data.get("params", []):
+                self._insert_param(tag_id, param_data)
+            return {"id": tag_id}
+
+    def get_tag(self, tag_id):
+        with self._lock:
+            return self._render_tag(tag_id) if tag_id in self._tags else None
+
+    def get_all_tags(self, skip=0, limit=100):
+        with self._lock:
+            return [self._render_tag(t) for t in islice(self._tags, skip, skip + limit)]
+
+    def get_tags_by_name(self, name):
+        with self._lock:
+            return [self._render_tag(t) for t in sorted(self._tag_ids_by_name.get(name, ()))]
+
+    def update_tag(self, tag_id, tag_data):
+        with self._lock:
+            tag = self._tags.get(tag_id)
+            if tag is None:
+                return None
+
+            updates = {k: v for k, v in tag_data.items() if (k == "tag" or k in TAG_DEFAULTS) and v is not None}
+            if "tag" in updates and updates["tag"] != tag["tag"]:
+                self._tag_ids_by_name[tag["tag"]].discard(tag_id)
+                self._tag_ids_by_name[updates["tag"]].add(tag_id)
+            tag.update(updates)
+
+            if tag_data.get("params") is not None:
+                self._remove_params_of(tag_id)
+                for param_data in tag_data["params"]:
+                    self._insert_param(tag_id, param_data)
+            return {"id": tag_id}
+
+    def delete_tag(self, tag_id):
+        with self._lock:
+            tag = self._tags.pop(tag_id, None)
+            if tag is None:
+                return False
+            self._tag_ids_by_name[tag["tag"]].discard(tag_id)
+            self._remove_params_of(tag_id)  # ON DELETE CASCADE
+            return True
+
+    def get_tags_by_ids(self, tag_ids):
+        with self._lock:
+            return [self._render_tag(t) for t in sorted(set(tag_ids) & self._tags.keys())]
+
+    def set_api_messages(self, messages):
+        with self._lock:
+            for tag_id, message in messages.items():
+                if tag_id in self._tags:
+                    self._tags[tag_id]["api_message"] = message
+
+    def bulk_delete_tags(self, ids, filters):
+        with self._lock:
+            selected = self._select_tags(ids, filters)
+            for tag_id in selected:
+                self.delete_tag(tag_id)
+            return selected
+
+    def bulk_update_tags(self, ids, filters, values):
+        with self._lock:
+            updates = {k: v for k, v in values.items() if (k == "tag" or k in TAG_DEFAULTS) and v is not None}
+            if not updates:
+                raise ValueError("'values' must set at least one tag field")
+            selected = self._select_tags(ids, filters)
+            for tag_id in selected:
+                self.update_tag(tag_id, updates)
+            return selected
+
+    def search_tags_by_options(self, contains, overlaps, field_type=None, value_type=None, skip=0, limit=100):
+        with self._lock:
+            matching = (
+                tag_id for tag_id in self._tags
+                if any(
+                    self._option_matches(self._params[p], contains, overlaps, field_type, value_type)
+                    for p in self._param_ids_by_tag.get(tag_id, [])
+                )
+            )
+            return [self._render_tag(t) for t in islice(matching, skip, skip + limit)]
+
+    # ============== Params ==============
+
+    def create_param(self, tag_id, param_data):
+        with self._lock:
+            if tag_id not in self._tags:
+                return None
+            return {"id": self._insert_param(tag_id, param_data), "tag_id": tag_id}
+
+    def get_param(self, param_id):
+        with self._lock:
+            param = self._params.get(param_id)
+            return copy.deepcopy(param) if param else None
+
+    def get_all_params(self, skip=0, limit=100):
+        with self._lock:
+            return [copy.deepcopy(p) for p in islice(self._params.values(), skip, skip + limit)]
+
+    def get_params_by_tag_id(self, tag_id):
+        with self._lock:
+            return self._render_params_of(tag_id)
+
+    def search_params_by_options(self, contains, overlaps, field_type=None, value_type=None, skip=0, limit=100):
+        with self._lock:
+            matching = (
+                p for p in self._params.values()
+                if self._option_matches(p, contains, overlaps, field_type, value_type)
+            )
+            return [copy.deepcopy(p) for p in islice(matching, skip, skip + limit)]
+
+    def update_param(self, param_id, param_data):
+        with self._lock:
+            param = self._params.get(param_id)
+            if param is None:
+                return None
+            allowed = {"db_column", "display_name", *PARAM_DEFAULTS}
+            for field, value in param_data.items():
+                if field in allowed and value is not None:
+                    param[field] = list(value) if field == "option_value" else value
+            return {"id": param_id, "tag_id": param["tag_id"]}
+
+    def delete_param(self, param_id):
+        with self._lock:
+            param = self._params.pop(param_id, None)
+            if param is None:
+                return False
+            self._param_ids_by_tag[param["tag_id"]].remove(param_id)
+            return True
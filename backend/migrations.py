@@ -0,0 +1,272 @@
+"""Versioned schema migrations.
+
+Each migration is applied once, in order, and recorded in ``schema_version``.
+At boot the application only reads the current version (one round trip) and
+skips all DDL when the schema is up to date; pending migrations are applied
+according to ``SCHEMA_STARTUP_MODE``:
+
+- ``migrate`` (default): apply pending migrations, skip if current
+- ``check``: refuse to start if migrations are pending
+- ``off``: do nothing
+
+Migrations can also be applied ahead of a deploy with the ``migrate`` command,
+so workers never contend for schema locks:
+
+    python migrations.py status
+    python migrations.py migrate
+
+Migrations are written to be idempotent (``IF NOT EXISTS``), so databases
+created by the previous ``create_all`` startup are adopted as-is.
+
+With ``TAG_DOCUMENTS_ENABLED`` the tag document functions and triggers are
+checked the same way: their installed version stamp is compared with
+``tag_documents.SCHEMA_VERSION`` and, when it differs, they are re-installed
+(and stale documents re-rendered) under the same advisory lock.
+"""
+import argparse
+import logging
+import sys
+import time
+
+import psycopg2.errors
+
+from config import SCHEMA_STARTUP_MODE, TAG_DOCUMENTS_ENABLED
+from crud_v2 import get_connection
+
+logger = logging.getLogger(__name__)
+
+# Serializes concurrent migrators (e.g. several workers booting at once)
+_ADVISORY_LOCK_KEY = 0x7A6D6967
+
+MIGRATIONS: list[tuple[int, str, str]] = [
+    (
+        1,
+        "Create tags and params tables",
+        """
+        CREATE TABLE IF NOT EXISTS tags (
+            id SERIAL PRIMARY KEY,
+            tag VARCHAR(100) NOT NULL,
+            query TEXT,
+            comment TEXT,
+            dynamic_param_source VARCHAR(255),
+            api_active BOOLEAN,
+            api_endpoint VARCHAR(255),
+            api_name VARCHAR(255),
+            api_at_get_data BOOLEAN,
+            api_message TEXT,
+            query_active BOOLEAN,
+            tag_active BOOLEAN
+        );
+        CREATE INDEX IF NOT EXISTS ix_tags_id ON tags (id);
+        CREATE INDEX IF NOT EXISTS ix_tags_tag ON tags (tag);
+
+        CREATE TABLE IF NOT EXISTS params (
+            id SERIAL PRIMARY KEY,
+            tag_id INTEGER NOT NULL REFERENCES tags (id) ON DELETE CASCADE,
+            db_column VARCHAR(100) NOT NULL,
+            display_name VARCHAR(200) NOT NULL,
+            option_value VARCHAR[],
+            field_type VARCHAR(50),
+            value_type VARCHAR(50),
+            api_param BOOLEAN
+        );
+        CREATE INDEX IF NOT EXISTS ix_params_id ON params (id);
+        """,
+    ),
+    (
+        2,
+        "Add tags.query_cache_ttl",
+        "ALTER TABLE tags ADD COLUMN IF NOT EXISTS query_cache_ttl INTEGER DEFAULT 0;",
+    ),
+    (
+        3,
+        "Add GIN index on params.option_value",
+        "CREATE INDEX IF NOT EXISTS ix_params_option_value ON params USING gin (option_value);",
+    ),
+    (
+        4,
+        "Create tag_documents table",
+        """
+        CREATE TABLE IF NOT EXISTS tag_documents (
+            tag_id INTEGER PRIMARY KEY REFERENCES tags (id) ON DELETE CASCADE,
+            document JSONB NOT NULL
+        );
+        """,
+    ),
+    (
+        5,
+        "Index params.tag_id",
+        "CREATE INDEX IF NOT EXISTS ix_params_tag_id ON params (tag_id);",
+    ),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Values of SCHEMA_STARTUP_MODE
+STARTUP_MODES = ("migrate", "check", "off")
+
+_CREATE_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+)
+"""
+
+
+class SchemaOutOfDate(RuntimeError):
+    """The database schema is behind the code and migrations are not allowed to run."""
+
+
+def current_version(conn) -> int:
+    """Return the applied schema version (0 for an unmanaged database)."""
+    with conn.cursor() as cur:
+        try:
+            cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+            return cur.fetchone()[0]
+        except psycopg2.errors.UndefinedTable:
+            return 0
+        finally:
+            conn.rollback()
+
+
+def migrate(conn) -> list[int]:
+    """Apply all pending migrations in one transaction. Returns the versions applied."""
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (_ADVISORY_LOCK_KEY,))
+            cur.execute(_CREATE_VERSION_TABLE)
+            cur.execute("SELECT version FROM schema_version")
+            done = {r[0] for r in cur.fetchall()}
+
+            applied = []
+            for version, description, sql in MIGRATIONS:
+                if version in done:
+                    continue
+                logger.info("Applying migration %s: %s", version, description)
+                cur.execute(sql)
+                cur.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                    (version, description),
+                )
+                applied.append(version)
+        conn.commit()
+        return applied
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _tag_documents_version(conn) -> str | None:
+    import tag_documents
+
+    try:
+        return tag_documents.installed_version(conn)
+    finally:
+        conn.rollback()
+
+
+def install_tag_documents(conn) -> int | None:
+    """Re-install the tag document triggers if outdated. Returns documents re-rendered, or None if current."""
+    import tag_documents
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (_ADVISORY_LOCK_KEY,))
+        # Another worker may have installed them while we waited for the lock
+        if tag_documents.installed_version(conn) == tag_documents.SCHEMA_VERSION:
+            conn.rollback()
+            return None
+        logger.info("Installing tag document triggers version %s", tag_documents.SCHEMA_VERSION)
+        tag_documents.install(conn)
+        repaired = tag_documents.rebuild_drifted(conn)
+        conn.commit()
+        return repaired
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def ensure_schema(mode: str = SCHEMA_STARTUP_MODE) -> dict:
+    """Boot-time schema check. Returns a report of what was done and how long it took."""
+    if mode not in STARTUP_MODES:
+        # A typo must not fall through to "migrate" and run DDL at boot
+        raise ValueError(
+            f"Unknown SCHEMA_STARTUP_MODE '{mode}'; expected one of: {', '.join(STARTUP_MODES)}"
+        )
+    started = time.perf_counter()
+    report = {"mode": mode, "target_version": LATEST_VERSION, "applied": []}
+    if mode == "off":
+        report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return report
+
+    conn = get_connection()
+    try:
+        version = current_version(conn)
+        if version < LATEST_VERSION:
+            if mode == "check":
+                raise SchemaOutOfDate(
+                    f"Schema is at version {version}, code expects {LATEST_VERSION}; "
+                    "run `python migrations.py migrate`"
+                )
+            report["applied"] = migrate(conn)
+            version = LATEST_VERSION
+
+        if TAG_DOCUMENTS_ENABLED:
+            import tag_documents
+
+            installed = _tag_documents_version(conn)
+            if installed != tag_documents.SCHEMA_VERSION:
+                if mode == "check":
+                    raise SchemaOutOfDate(
+                        f"Tag document triggers are at version {installed}, code expects "
+                        f"{tag_documents.SCHEMA_VERSION}; run `python migrations.py migrate`"
+                    )
+                repaired = install_tag_documents(conn)
+                if repaired is not None:
+                    report["installed_tag_document_triggers"] = tag_documents.SCHEMA_VERSION
+                    report["rebuilt_tag_documents"] = repaired
+
+        report["version"] = version
+    finally:
+        conn.close()
+
+    report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Manage the database schema version.")
+    parser.add_argument("command", choices=["status", "migrate"])
+    args = parser.parse_args(argv)
+
+    conn = get_connection()
+    try:
+        if args.command == "status":
+            version = current_version(conn)
+            print(f"Schema version {version} (latest {LATEST_VERSION})")
+            for v, description, _ in MIGRATIONS:
+                print(f"  [{'x' if v <= version else ' '}] {v}: {description}")
+            current = version >= LATEST_VERSION
+            if TAG_DOCUMENTS_ENABLED and current:
+                import tag_documents
+
+                installed = _tag_documents_version(conn)
+                print(f"Tag document triggers: {installed} (latest {tag_documents.SCHEMA_VERSION})")
+                current = installed == tag_documents.SCHEMA_VERSION
+            return 0 if current else 1
+
+        applied = migrate(conn)
+        print(f"Applied {len(applied)} migration(s)" + (f": {applied}" if applied else ""))
+        if TAG_DOCUMENTS_ENABLED:
+            repaired = install_tag_documents(conn)
+            if repaired is not None:
+                print(f"Installed tag document triggers, rebuilt {repaired} document(s)")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional
 
 
@@ -44,13 +44,14 @@ class TagBase(BaseModel):
     api_message: str = Field(default="")
     query_active: bool = Field(default=True)
     tag_active: bool = Field(default=True)
+    query_cache_ttl: int = Field(default=0, ge=0)
 
 
 class TagCreate(TagBase):
     params: list[ParamCreate] = Field(default_factory=list)
 
 
-class TagUpdate(BaseModel):
+class TagFieldsUpdate(BaseModel):
     tag: Optional[str] = Field(None, min_length=2, max_length=100)
     query: Optional[str] = None
     comment: Optional[str] = None
@@ -62,6 +63,10 @@ class TagUpdate(BaseModel):
     api_message: Optional[str] = None
     query_active: Optional[bool] = None
     tag_active: Optional[bool] = None
+    query_cache_ttl: Optional[int] = Field(None, ge=0)
+
+
+class TagUpdate(TagFieldsUpdate):
     params: Optional[list[ParamCreate]] = None
 
 
@@ -83,3 +88,46 @@ class ParamResponse(BaseModel):
     success: bool
     id: int
     message: str
+
+
+class TagFilter(BaseModel):
+    """Whitelisted fields a bulk operation may select tags by."""
+    tag: Optional[str] = None
+    tag_active: Optional[bool] = None
+    query_active: Optional[bool] = None
+    api_active: Optional[bool] = None
+    api_at_get_data: Optional[bool] = None
+
+    class Config:
+        extra = "forbid"
+
+
+class TagSelection(BaseModel):
+    ids: Optional[list[int]] = None
+    filter: Optional[TagFilter] = None
+
+    @model_validator(mode="after")
+    def check_selection(self):
+        if not self.ids and not (self.filter and self.filter.model_dump(exclude_none=True)):
+            raise ValueError("Provide a non-empty 'ids' list or at least one 'filter' field")
+        return self
+
+
+class TagBulkUpdate(TagSelection):
+    values: TagFieldsUpdate
+
+    @model_validator(mode="after")
+    def check_values(self):
+        values = self.values.model_dump(exclude_unset=True)
+        if not values:
+            raise ValueError("'values' must set at least one field")
+        nulls = sorted(name for name, value in values.items() if value is None)
+        if nulls:
+            raise ValueError(f"'values' fields cannot be null: {', '.join(nulls)}")
+        return self
+
+
+class BulkResponse(BaseModel):
+    success: bool
+    affected: int
+    message: str
@@ -0,0 +1,70 @@
+"""Response format negotiation for tag reads.
+
+Clients that send ``Accept: application/msgpack`` get MessagePack instead of
+JSON. List responses can also be requested in a columnar layout
+(``layout=columnar``): one array per field instead of one object per row,
+which avoids repeating every key for every tag.
+"""
+import msgpack
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+
+MSGPACK_TYPES = {"application/msgpack", "application/x-msgpack"}
+JSON_TYPES = {"application/json", "*/*", "application/*"}
+LAYOUTS = {"rows", "columnar"}
+
+
+class MsgPackResponse(Response):
+    media_type = "application/msgpack"
+
+    def render(self, content) -> bytes:
+        return msgpack.packb(content, use_bin_type=True)
+
+
+def _quality(params: list[str]) -> float:
+    for param in params:
+        key, _, value = param.strip().partition("=")
+        if key.strip() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def wants_msgpack(request: Request) -> bool:
+    """True if the Accept header prefers MessagePack over JSON."""
+    best_msgpack = best_json = 0.0
+    for entry in request.headers.get("accept", "").split(","):
+        media_type, *params = entry.split(";")
+        media_type = media_type.strip().lower()
+        if media_type in MSGPACK_TYPES:
+            best_msgpack = max(best_msgpack, _quality(params))
+        elif media_type in JSON_TYPES:
+            best_json = max(best_json, _quality(params))
+    return best_msgpack > 0 and best_msgpack >= best_json
+
+
+def check_layout(layout: str) -> None:
+    if layout not in LAYOUTS:
+        raise HTTPException(status_code=422, detail=f"'layout' must be one of: {', '.join(sorted(LAYOUTS))}")
+
+
+def to_columnar(rows: list[dict]) -> dict[str, list]:
+    """Turn a list of row dicts into one list per field.
+
+    Fields are the union over all rows (in first-seen order); a row missing a
+    field (e.g. a tag document rendered before the field existed) gets ``None``.
+    """
+    fields = dict.fromkeys(field for row in rows for field in row)
+    return {field: [row.get(field) for row in rows] for field in fields}
+
+
+def render(request: Request, content, layout: str = "rows") -> Response:
+    """Encode ``content`` in the negotiated format and layout."""
+    if layout == "columnar" and isinstance(content, list):
+        content = to_columnar(content)
+    headers = {"Vary": "Accept"}
+    if wants_msgpack(request):
+        return MsgPackResponse(content, headers=headers)
+    return JSONResponse(content, headers=headers)
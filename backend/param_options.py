@@ -0,0 +1,147 @@
+"""Option lists for params.
+
+A param's options come either from its static ``option_value`` array or from
+the tag's ``dynamic_param_source``: a read-only SQL query (optionally written
+as ``sql:SELECT ...``) whose result has one column per param ``db_column``.
+The distinct values of that column become the param's options.
+
+Resolved dynamic lists are sorted and cached, so prefix search is a binary
+search and pagination is a slice. At most ``DYNAMIC_OPTIONS_MAX_VALUES`` values
+are kept: the first ones in code-point order, so a list that was cut off is
+still complete for any prefix whose matches end before the cut-off.
+"""
+from bisect import bisect_left
+
+import psycopg2
+import psycopg2.errors
+from psycopg2 import sql
+
+from cache import TagCache
+from config import (
+    DYNAMIC_OPTIONS_CACHE_TTL,
+    DYNAMIC_OPTIONS_MAX_VALUES,
+    QUERY_STATEMENT_TIMEOUT_MS,
+)
+from crud_v2 import get_query_connection
+from tag_query import QueryExecutionError, QueryTimeoutError, ensure_single_statement
+
+
+SQL_SCHEME = "sql:"
+
+options_cache = TagCache(max_entries=512)
+
+
+class OptionSourceError(ValueError):
+    """The tag's dynamic_param_source is not a supported source."""
+
+
+def source_query(dynamic_param_source: str) -> str:
+    """Extract the SQL from a dynamic_param_source, validating its scheme."""
+    source = dynamic_param_source.strip()
+    if source.lower().startswith(SQL_SCHEME):
+        source = source[len(SQL_SCHEME):].strip()
+    elif source and ":" in source.split(None, 1)[0]:
+        scheme = source.split(":", 1)[0]
+        raise OptionSourceError(f"Unsupported dynamic_param_source scheme '{scheme}'")
+    if not source:
+        raise OptionSourceError("dynamic_param_source is empty")
+    return source
+
+
+def _fetch_distinct(query: str, column: str) -> tuple[list[str], bool]:
+    """Return (sorted distinct values, whether the list was cut off at the maximum)."""
+    # The source is wrapped in a subquery; a ";" could still end it early
+    ensure_single_statement(query)
+    conn = get_query_connection()
+    try:
+        conn.set_session(readonly=True)
+        with conn.cursor() as cur:
+            cur.execute("SET LOCAL statement_timeout = %s", (QUERY_STATEMENT_TIMEOUT_MS,))
+            cur.execute(
+                sql.SQL(
+                    # "C" collation sorts by code point, the same order as Python's str
+                    'SELECT DISTINCT CAST(src.{col} AS TEXT) COLLATE "C" AS value FROM ({query}) AS src '
+                    "WHERE src.{col} IS NOT NULL ORDER BY value LIMIT %s"
+                ).format(col=sql.Identifier(column), query=sql.SQL(query.replace("%", "%%"))),
+                (DYNAMIC_OPTIONS_MAX_VALUES + 1,),
+            )
+            values = [r[0] for r in cur.fetchall()]
+            truncated = len(values) > DYNAMIC_OPTIONS_MAX_VALUES
+            return values[:DYNAMIC_OPTIONS_MAX_VALUES], truncated
+    except psycopg2.errors.QueryCanceled as e:
+        raise QueryTimeoutError(str(e).strip()) from e
+    except psycopg2.Error as e:
+        raise QueryExecutionError(str(e).strip()) from e
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def dynamic_options(tag: dict, param: dict) -> tuple[list[str], bool]:
+    """Resolve (and cache) the sorted distinct option values for a param, and whether they were cut off."""
+    query = source_query(tag["dynamic_param_source"])
+    key = (tag["id"], query, param["db_column"])
+    resolved = options_cache.get(key)
+    if resolved is None:
+        resolved = _fetch_distinct(query, param["db_column"])
+        options_cache.put(key, resolved, DYNAMIC_OPTIONS_CACHE_TTL)
+    return resolved
+
+
+def prefix_range(values: list[str], prefix: str) -> tuple[int, int]:
+    """Return the slice bounds of the values starting with ``prefix`` in a sorted list."""
+    if not prefix:
+        return 0, len(values)
+    lo = bisect_left(values, prefix)
+    return lo, bisect_left(values, prefix + "\U0010ffff", lo)
+
+
+def search_sorted(values: list[str], prefix: str) -> list[str]:
+    """Return the values starting with ``prefix`` from a sorted list."""
+    lo, hi = prefix_range(values, prefix)
+    return values[lo:hi]
+
+
+def resolve(tag: dict, param: dict, source: str, prefix: str, skip: int, limit: int) -> dict:
+    """Return one page of a param's options from the requested source."""
+    if source == "auto":
+        source = "dynamic" if tag["dynamic_param_source"].strip() else "static"
+
+    truncated = False
+    if source == "dynamic":
+        values, cut_off = dynamic_options(tag, param)
+        lo, hi = prefix_range(values, prefix)
+        matches = values[lo:hi]
+        # Dropped values sort after every kept one, so only matches that run to
+        # the end of the kept list can be incomplete
+        truncated = cut_off and hi == len(values)
+    else:
+        matches = [v for v in param["option_value"] if v.startswith(prefix)]
+
+    return {
+        "tag_id": tag["id"],
+        "param_id": param["id"],
+        "source": source,
+        "total": len(matches),
+        "truncated": truncated,
+        "skip": skip,
+        "limit": limit,
+        "values": matches[skip:skip + limit],
+    }
+
+
+def option_reference(param: dict) -> dict:
+    """Reference to a param's static options, used in place of a large array."""
+    return {
+        "count": len(param["option_value"]),
+        "url": f"/v2/tags/{param['tag_id']}/params/{param['id']}/options?source=static",
+    }
+
+
+def collapse_options(tags: list[dict], max_options: int) -> None:
+    """Replace option_value arrays longer than ``max_options`` with a reference, in place."""
+    for tag in tags:
+        for param in tag["params"]:
+            if len(param["option_value"]) > max_options:
+                param["option_value_ref"] = option_reference(param)
+                param["option_value"] = []
@@ -1,10 +1,63 @@
-from fastapi import APIRouter, HTTPException, status, Request
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Query, status, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
 
 import crud_v2
+import negotiation
+import param_options
+import tag_api
+import tag_query
+from config import TAG_DOCUMENTS_ENABLED
+from models import TagBulkUpdate, TagSelection
+from storage import get_storage
 
 router = APIRouter(prefix="/v2", tags=["v2"])
 
+READ_SOURCES = {"tables", "documents"}
+OPTION_SOURCES = {"auto", "static", "dynamic"}
+
+
+def _check_option_filters(contains: list[str], overlaps: list[str]) -> None:
+    if not contains and not overlaps:
+        raise HTTPException(status_code=422, detail="At least one of 'contains' or 'overlaps' is required")
+
+
+def _invalidate_tag_caches(tag_ids: list[int]) -> None:
+    for tag_id in tag_ids:
+        tag_query.result_cache.invalidate_tag(tag_id)
+        param_options.options_cache.invalidate_tag(tag_id)
+
+
+async def _json_object(request: Request) -> dict:
+    """Read a request body that must be a JSON object; an empty body reads as ``{}``."""
+    if not await request.body():
+        return {}
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Request body must be valid JSON")
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=422, detail="Request body must be a JSON object")
+    return body
+
+
+def _validate(model: type[BaseModel], body: dict):
+    try:
+        return model.model_validate(body)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+
+
+def _selection_filter(selection: TagSelection) -> dict | None:
+    return selection.filter.model_dump(exclude_none=True) if selection.filter else None
+
+
+def _check_source(source: str) -> None:
+    if source not in READ_SOURCES:
+        raise HTTPException(status_code=422, detail=f"'source' must be one of: {', '.join(sorted(READ_SOURCES))}")
+    if source == "documents" and not TAG_DOCUMENTS_ENABLED:
+        raise HTTPException(status_code=400, detail="Tag documents are not enabled (set TAG_DOCUMENTS_ENABLED=true)")
+
 
 # ============== Tag Endpoints ==============
 
@@ -15,40 +68,177 @@ async def create_tag(request: Request):
     if not tag_data.get("tag") or len(tag_data["tag"]) < 2:
         raise HTTPException(status_code=422, detail="'tag' is required and must be at least 2 characters")
 
-    result = crud_v2.create_tag(tag_data)
+    result = get_storage().create_tag(tag_data)
     return {"success": True, "id": result["id"], "message": f"Tag created successfully with ID: {result['id']}"}
 
 
 @router.get("/tags")
-async def get_all_tags(skip: int = 0, limit: int = 100):
-    tags = crud_v2.get_all_tags(skip=skip, limit=limit)
-    return tags
+async def get_all_tags(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    source: str = "tables",
+    max_options: int | None = None,
+    tag: str | None = None,
+    layout: str = "rows",
+):
+    _check_source(source)
+    negotiation.check_layout(layout)
+    if source == "documents" and tag is not None:
+        raise HTTPException(status_code=422, detail="'tag' cannot be combined with source=documents")
+    if source == "documents":
+        tags = crud_v2.get_all_tag_documents(skip=skip, limit=limit)
+    elif tag is not None:
+        tags = get_storage().get_tags_by_name(tag)[skip:skip + limit]
+    else:
+        tags = get_storage().get_all_tags(skip=skip, limit=limit)
+    if max_options is not None:
+        param_options.collapse_options(tags, max_options)
+    return negotiation.render(request, tags, layout)
+
+
+@router.delete("/tags")
+async def bulk_delete_tags(request: Request):
+    selection = _validate(TagSelection, await _json_object(request))
+    try:
+        deleted = get_storage().bulk_delete_tags(selection.ids, _selection_filter(selection))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    _invalidate_tag_caches(deleted)
+    return {"success": True, "affected": len(deleted), "message": f"Deleted {len(deleted)} tag(s)"}
+
+
+@router.patch("/tags")
+async def bulk_update_tags(request: Request):
+    bulk = _validate(TagBulkUpdate, await _json_object(request))
+    values = bulk.values.model_dump(exclude_unset=True)
+    try:
+        updated = get_storage().bulk_update_tags(bulk.ids, _selection_filter(bulk), values)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    _invalidate_tag_caches(updated)
+    return {"success": True, "affected": len(updated), "message": f"Updated {len(updated)} tag(s)"}
+
+
+@router.get("/tags/by-option")
+async def search_tags_by_options(
+    contains: list[str] = Query(default=[]),
+    overlaps: list[str] = Query(default=[]),
+    field_type: str | None = None,
+    value_type: str | None = None,
+    skip: int = 0,
+    limit: int = 100,
+):
+    _check_option_filters(contains, overlaps)
+    return get_storage().search_tags_by_options(contains, overlaps, field_type, value_type, skip=skip, limit=limit)
 
 
 @router.get("/tags/{tag_id}")
-async def get_tag(tag_id: int):
-    tag = crud_v2.get_tag(tag_id)
+async def get_tag(request: Request, tag_id: int, source: str = "tables", max_options: int | None = None):
+    _check_source(source)
+    if source == "documents":
+        tag = crud_v2.get_tag_document(tag_id)
+    else:
+        tag = get_storage().get_tag(tag_id)
     if not tag:
         raise HTTPException(status_code=404, detail=f"Tag with ID {tag_id} not found")
-    return tag
+    if max_options is not None:
+        param_options.collapse_options([tag], max_options)
+    return negotiation.render(request, tag)
 
 
 @router.put("/tags/{tag_id}")
 async def update_tag(tag_id: int, request: Request):
     tag_data = await request.json()
-    result = crud_v2.update_tag(tag_id, tag_data)
+    result = get_storage().update_tag(tag_id, tag_data)
     if not result:
         raise HTTPException(status_code=404, detail=f"Tag with ID {tag_id} not found")
+    _invalidate_tag_caches([tag_id])
     return {"success": True, "id": tag_id, "message": "Tag updated successfully"}
 
 
 @router.delete("/tags/{tag_id}")
 async def delete_tag(tag_id: int):
-    if not crud_v2.delete_tag(tag_id):
+    if not get_storage().delete_tag(tag_id):
         raise HTTPException(status_code=404, detail=f"Tag with ID {tag_id} not found")
+    _invalidate_tag_caches([tag_id])
     return {"success": True, "id": tag_id, "message": "Tag deleted successfully"}
 
 
+@router.post("/tags/{tag_id}/execute")
+async def execute_tag_query(tag_id: int, request: Request):
+    body = await _json_object(request)
+    values = body.get("params", {})
+    if not isinstance(values, dict):
+        raise HTTPException(status_code=422, detail="'params' must be an object of db_column -> value")
+
+    tag = get_storage().get_tag(tag_id)
+    if not tag:
+        raise HTTPException(status_code=404, detail=f"Tag with ID {tag_id} not found")
+    if not tag["query_active"] or not tag["query"].strip():
+        raise HTTPException(status_code=409, detail=f"Tag with ID {tag_id} has no active query")
+
+    try:
+        bound = tag_query.bind_params(tag["query"], tag["params"], values)
+        cache_hit, body_chunks = tag_query.execute(tag, bound)
+    except tag_query.QueryParamError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except tag_query.QueryTimeoutError as e:
+        raise HTTPException(status_code=504, detail=f"Query timed out: {e}")
+    except tag_query.QueryExecutionError as e:
+        raise HTTPException(status_code=400, detail=f"Query failed: {e}")
+
+    return StreamingResponse(
+        body_chunks,
+        media_type="application/json",
+        headers={"X-Cache": "HIT" if cache_hit else "MISS"},
+    )
+
+
+# ============== Upstream API Endpoints ==============
+
+def _api_values(body: dict) -> dict:
+    values = body.get("params", {})
+    if not isinstance(values, dict):
+        raise HTTPException(status_code=422, detail="'params' must be an object of db_column -> value")
+    return values
+
+
+async def _fetch_api_data(tags: list[dict], values: dict) -> list[dict]:
+    results = await tag_api.fetch_tags(tags, values)
+    get_storage().set_api_messages({
+        r["tag_id"]: tag_api.result_message(r)
+        for r in results
+        if r["status"] != "skipped" and not r["cached"]
+    })
+    return results
+
+
+@router.post("/tags/api-data")
+async def fetch_api_data(request: Request):
+    body = await _json_object(request)
+    values = _api_values(body)
+    tag_ids = body.get("tag_ids")
+    if not isinstance(tag_ids, list) or not tag_ids or not all(isinstance(i, int) for i in tag_ids):
+        raise HTTPException(status_code=422, detail="'tag_ids' must be a non-empty list of integers")
+
+    tags = get_storage().get_tags_by_ids(tag_ids)
+    missing = set(tag_ids) - {t["id"] for t in tags}
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Tags not found: {', '.join(map(str, sorted(missing)))}")
+    return await _fetch_api_data(tags, values)
+
+
+@router.post("/tags/{tag_id}/api-data")
+async def fetch_tag_api_data(tag_id: int, request: Request):
+    values = _api_values(await _json_object(request))
+    tag = get_storage().get_tag(tag_id)
+    if not tag:
+        raise HTTPException(status_code=404, detail=f"Tag with ID {tag_id} not found")
+    results = await _fetch_api_data([tag], values)
+    return results[0]
+
+
 # ============== Param Endpoints ==============
 
 @router.post("/tags/{tag_id}/params", status_code=status.HTTP_201_CREATED)
@@ -58,7 +248,7 @@ async def create_param(tag_id: int, request: Request):
     if not param_data.get("db_column") or not param_data.get("display_name"):
         raise HTTPException(status_code=422, detail="'db_column' and 'display_name' are required")
 
-    result = crud_v2.create_param(tag_id, param_data)
+    result = get_storage().create_param(tag_id, param_data)
     if not result:
         raise HTTPException(status_code=404, detail=f"Tag with ID {tag_id} not found")
     return {"success": True, "id": result["id"], "message": f"Parameter created successfully with ID: {result['id']}"}
@@ -66,20 +256,59 @@ async def create_param(tag_id: int, request: Request):
 
 @router.get("/params")
 async def get_all_params(skip: int = 0, limit: int = 100):
-    return crud_v2.get_all_params(skip=skip, limit=limit)
+    return get_storage().get_all_params(skip=skip, limit=limit)
+
+
+@router.get("/params/by-option")
+async def search_params_by_options(
+    contains: list[str] = Query(default=[]),
+    overlaps: list[str] = Query(default=[]),
+    field_type: str | None = None,
+    value_type: str | None = None,
+    skip: int = 0,
+    limit: int = 100,
+):
+    _check_option_filters(contains, overlaps)
+    return get_storage().search_params_by_options(contains, overlaps, field_type, value_type, skip=skip, limit=limit)
 
 
 @router.get("/tags/{tag_id}/params")
 async def get_params_by_tag(tag_id: int):
-    tag = crud_v2.get_tag(tag_id)
+    tag = get_storage().get_tag(tag_id)
     if not tag:
         raise HTTPException(status_code=404, detail=f"Tag with ID {tag_id} not found")
-    return crud_v2.get_params_by_tag_id(tag_id)
+    return get_storage().get_params_by_tag_id(tag_id)
+
+
+@router.get("/tags/{tag_id}/params/{param_id}/options")
+async def get_param_options(
+    tag_id: int, param_id: int, prefix: str = "", skip: int = 0, limit: int = 100, source: str = "auto"
+):
+    if source not in OPTION_SOURCES:
+        raise HTTPException(status_code=422, detail=f"'source' must be one of: {', '.join(sorted(OPTION_SOURCES))}")
+    if skip < 0 or limit < 1:
+        raise HTTPException(status_code=422, detail="'skip' must be >= 0 and 'limit' >= 1")
+
+    tag = get_storage().get_tag(tag_id)
+    if not tag:
+        raise HTTPException(status_code=404, detail=f"Tag with ID {tag_id} not found")
+    param = next((p for p in tag["params"] if p["id"] == param_id), None)
+    if not param:
+        raise HTTPException(status_code=404, detail=f"Parameter with ID {param_id} not found for tag {tag_id}")
+
+    try:
+        return param_options.resolve(tag, param, source, prefix, skip, limit)
+    except param_options.OptionSourceError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except tag_query.QueryTimeoutError as e:
+        raise HTTPException(status_code=504, detail=f"Option source timed out: {e}")
+    except tag_query.QueryExecutionError as e:
+        raise HTTPException(status_code=400, detail=f"Option source failed: {e}")
 
 
 @router.get("/params/{param_id}")
 async def get_param(param_id: int):
-    param = crud_v2.get_param(param_id)
+    param = get_storage().get_param(param_id)
     if not param:
         raise HTTPException(status_code=404, detail=f"Parameter with ID {param_id} not found")
     return param
@@ -88,14 +317,15 @@ async def get_param(param_id: int):
 @router.put("/params/{param_id}")
 async def update_param(param_id: int, request: Request):
     param_data = await request.json()
-    result = crud_v2.update_param(param_id, param_data)
+    result = get_storage().update_param(param_id, param_data)
     if not result:
         raise HTTPException(status_code=404, detail=f"Parameter with ID {param_id} not found")
+    param_options.options_cache.invalidate_tag(result["tag_id"])
     return {"success": True, "id": param_id, "message": "Parameter updated successfully"}
 
 
 @router.delete("/params/{param_id}")
 async def delete_param(param_id: int):
-    if not crud_v2.delete_param(param_id):
+    if not get_storage().delete_param(param_id):
         raise HTTPException(status_code=404, detail=f"Parameter with ID {param_id} not found")
     return {"success": True, "id": param_id, "message": "Parameter deleted successfully"}
@@ -0,0 +1,313 @@
+"""Pluggable storage for Tag/Param CRUD.
+
+``Storage`` is the dict-in/dict-out interface the v2 CRUD routes use. It is
+implemented by:
+
+- ``RawSQLStorage``: raw psycopg2 SQL (crud_v2.py), the default
+- ``ORMStorage``: the SQLAlchemy ORM (crud.py)
+- ``MemoryStorage``: indexed in-process structures (memory_storage.py), for
+  tests and benchmarks that should not need Postgres
+
+The backend is chosen with ``STORAGE_BACKEND`` (``postgres``, ``orm`` or ``memory``).
+"""
+from abc import ABC, abstractmethod
+
+from config import STORAGE_BACKEND
+
+
+class Storage(ABC):
+    # ============== Tags ==============
+
+    @abstractmethod
+    def create_tag(self, tag_data: dict) -> dict:
+        """Create a tag with its params; returns ``{"id": ...}``."""
+
+    @abstractmethod
+    def get_tag(self, tag_id: int) -> dict | None:
+        """Get a tag with its params."""
+
+    @abstractmethod
+    def get_all_tags(self, skip: int = 0, limit: int = 100) -> list[dict]:
+        """Get a page of tags with their params."""
+
+    @abstractmethod
+    def get_tags_by_name(self, name: str) -> list[dict]:
+        """Get all tags with the given ``tag`` name, ordered by ID."""
+
+    @abstractmethod
+    def update_tag(self, tag_id: int, tag_data: dict) -> dict | None:
+        """Update provided fields; replaces params if ``params`` is given."""
+
+    @abstractmethod
+    def delete_tag(self, tag_id: int) -> bool:
+        """Delete a tag and (by cascade) its params."""
+
+    @abstractmethod
+    def get_tags_by_ids(self, tag_ids: list[int]) -> list[dict]:
+        """Get several tags with their params, ordered by ID; unknown IDs are skipped."""
+
+    @abstractmethod
+    def set_api_messages(self, messages: dict[int, str]) -> None:
+        """Set ``api_message`` on several tags, keyed by tag ID."""
+
+    @abstractmethod
+    def bulk_delete_tags(self, ids: list[int] | None, filters: dict | None) -> list[int]:
+        """Delete the tags selected by ID and/or field equality; returns the deleted IDs."""
+
+    @abstractmethod
+    def bulk_update_tags(self, ids: list[int] | None, filters: dict | None, values: dict) -> list[int]:
+        """Set ``values`` on the selected tags; returns the updated IDs."""
+
+    @abstractmethod
+    def search_tags_by_options(
+        self,
+        contains: list[str],
+        overlaps: list[str],
+        field_type: str | None = None,
+        value_type: str | None = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> list[dict]:
+        """Tags having a param whose option_value matches, ordered by ID."""
+
+    # ============== Params ==============
+
+    @abstractmethod
+    def create_param(self, tag_id: int, param_data: dict) -> dict | None:
+        """Add a param to a tag; returns ``{"id": ..., "tag_id": ...}``."""
+
+    @abstractmethod
+    def get_param(self, param_id: int) -> dict | None:
+        """Get a param by ID."""
+
+    @abstractmethod
+    def get_all_params(self, skip: int = 0, limit: int = 100) -> list[dict]:
+        """Get a page of params."""
+
+    @abstractmethod
+    def get_params_by_tag_id(self, tag_id: int) -> list[dict]:
+        """Get a tag's params ordered by ID."""
+
+    @abstractmethod
+    def search_params_by_options(
+        self,
+        contains: list[str],
+        overlaps: list[str],
+        field_type: str | None = None,
+        value_type: str | None = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> list[dict]:
+        """Params whose option_value contains all of ``contains`` and any of ``overlaps``."""
+
+    @abstractmethod
+    def update_param(self, param_id: int, param_data: dict) -> dict | None:
+        """Update provided fields of a param."""
+
+    @abstractmethod
+    def delete_param(self, param_id: int) -> bool:
+        """Delete a param."""
+
+
+class RawSQLStorage(Storage):
+    """Storage backed by the raw SQL functions in crud_v2.py."""
+
+    def __init__(self):
+        import crud_v2
+
+        self._crud = crud_v2
+
+    def create_tag(self, tag_data):
+        return self._crud.create_tag(tag_data)
+
+    def get_tag(self, tag_id):
+        return self._crud.get_tag(tag_id)
+
+    def get_all_tags(self, skip=0, limit=100):
+        return self._crud.get_all_tags(skip=skip, limit=limit)
+
+    def get_tags_by_name(self, name):
+        return self._crud.get_tags_by_name(name)
+
+    def update_tag(self, tag_id, tag_data):
+        return self._crud.update_tag(tag_id, tag_data)
+
+    def delete_tag(self, tag_id):
+        return self._crud.delete_tag(tag_id)
+
+    def get_tags_by_ids(self, tag_ids):
+        return self._crud.get_tags_by_ids(tag_ids)
+
+    def set_api_messages(self, messages):
+        self._crud.set_api_messages(messages)
+
+    def bulk_delete_tags(self, ids, filters):
+        return self._crud.bulk_delete_tags(ids, filters)
+
+    def bulk_update_tags(self, ids, filters, values):
+        return self._crud.bulk_update_tags(ids, filters, values)
+
+    def search_tags_by_options(self, contains, overlaps, field_type=None, value_type=None, skip=0, limit=100):
+        return self._crud.search_tags_by_options(contains, overlaps, field_type, value_type, skip=skip, limit=limit)
+
+    def create_param(self, tag_id, param_data):
+        return self._crud.create_param(tag_id, param_data)
+
+    def get_param(self, param_id):
+        return self._crud.get_param(param_id)
+
+    def get_all_params(self, skip=0, limit=100):
+        return self._crud.get_all_params(skip=skip, limit=limit)
+
+    def get_params_by_tag_id(self, tag_id):
+        return self._crud.get_params_by_tag_id(tag_id)
+
+    def search_params_by_options(self, contains, overlaps, field_type=None, value_type=None, skip=0, limit=100):
+        return self._crud.search_params_by_options(contains, overlaps, field_type, value_type, skip=skip, limit=limit)
+
+    def update_param(self, param_id, param_data):
+        return self._crud.update_param(param_id, param_data)
+
+    def delete_param(self, param_id):
+        return self._crud.delete_param(param_id)
+
+
+class ORMStorage(Storage):
+    """Storage backed by the SQLAlchemy ORM functions in crud.py."""
+
+    def __init__(self):
+        import crud
+        import models
+        from database import SessionLocal, get_engine
+
+        get_engine()
+        self._crud = crud
+        self._models = models
+        self._session = SessionLocal
+
+    def _tag(self, obj) -> dict:
+        return self._models.Tag.model_validate(obj).model_dump()
+
+    def _param(self, obj) -> dict:
+        return self._models.Param.model_validate(obj).model_dump()
+
+    def create_tag(self, tag_data):
+        with self._session() as db:
+            return {"id": self._crud.create_tag(db, self._models.TagCreate(**tag_data)).id}
+
+    def get_tag(self, tag_id):
+        with self._session() as db:
+            tag = self._crud.get_tag(db, tag_id)
+            return self._tag(tag) if tag else None
+
+    def get_all_tags(self, skip=0, limit=100):
+        with self._session() as db:
+            return [self._tag(t) for t in self._crud.get_all_tags(db, skip=skip, limit=limit)]
+
+    def get_tags_by_name(self, name):
+        with self._session() as db:
+            return [self._tag(t) for t in self._crud.get_tags_by_name(db, name)]
+
+    def update_tag(self, tag_id, tag_data):
+        with self._session() as db:
+            updates = {k: v for k, v in tag_data.items() if v is not None}
+            tag = self._crud.update_tag(db, tag_id, self._models.TagUpdate(**updates))
+            return {"id": tag_id} if tag else None
+
+    def delete_tag(self, tag_id):
+        with self._session() as db:
+            return self._crud.delete_tag(db, tag_id)
+
+    def get_tags_by_ids(self, tag_ids):
+        with self._session() as db:
+            return [self._tag(t) for t in self._crud.get_tags_by_ids(db, tag_ids)]
+
+    def set_api_messages(self, messages):
+        with self._session() as db:
+            self._crud.set_api_messages(db, messages)
+
+    def _selection(self, ids, filters):
+        tag_filter = self._models.TagFilter(**filters) if filters else None
+        if not ids and not (tag_filter and tag_filter.model_dump(exclude_none=True)):
+            raise ValueError("Provide a non-empty 'ids' list or at least one 'filter' field")
+        return ids, tag_filter
+
+    def bulk_delete_tags(self, ids, filters):
+        with self._session() as db:
+            return self._crud.bulk_delete_tags(db, *self._selection(ids, filters))
+
+    def bulk_update_tags(self, ids, filters, values):
+        updates = {k: v for k, v in values.items() if v is not None}
+        if not updates:
+            raise ValueError("'values' must set at least one tag field")
+        with self._session() as db:
+            return self._crud.bulk_update_tags(
+                db, *self._selection(ids, filters), self._models.TagFieldsUpdate(**updates)
+            )
+
+    def search_tags_by_options(self, contains, overlaps, field_type=None, value_type=None, skip=0, limit=100):
+        with self._session() as db:
+            tags = self._crud.search_tags_by_options(
+                db, contains, overlaps, field_type, value_type, skip=skip, limit=limit
+            )
+            return [self._tag(t) for t in tags]
+
+    def create_param(self, tag_id, param_data):
+        with self._session() as db:
+            param = self._crud.create_param(db, tag_id, self._models.ParamCreate(**param_data))
+            return {"id": param.id, "tag_id": tag_id} if param else None
+
+    def get_param(self, param_id):
+        with self._session() as db:
+            param = self._crud.get_param(db, param_id)
+            return self._param(param) if param else None
+
+    def get_all_params(self, skip=0, limit=100):
+        with self._session() as db:
+            return [self._param(p) for p in self._crud.get_all_params(db, skip=skip, limit=limit)]
+
+    def get_params_by_tag_id(self, tag_id):
+        with self._session() as db:
+            return [self._param(p) for p in self._crud.get_params_by_tag_id(db, tag_id)]
+
+    def search_params_by_options(self, contains, overlaps, field_type=None, value_type=None, skip=0, limit=100):
+        with self._session() as db:
+            params = self._crud.search_params_by_options(
+                db, contains, overlaps, field_type, value_type, skip=skip, limit=limit
+            )
+            return [self._param(p) for p in params]
+
+    def update_param(self, param_id, param_data):
+        with self._session() as db:
+            updates = {k: v for k, v in param_data.items() if v is not None}
+            param = self._crud.update_param(db, param_id, self._models.ParamUpdate(**updates))
+            return {"id": param_id, "tag_id": param.tag_id} if param else None
+
+    def delete_param(self, param_id):
+        with self._session() as db:
+            return self._crud.delete_param(db, param_id)
+
+
+_BACKENDS = {"postgres": RawSQLStorage, "orm": ORMStorage}
+_storage: Storage | None = None
+
+
+def get_storage() -> Storage:
+    """Return the configured storage backend, creating it on first use."""
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND == "memory":
+            from memory_storage import MemoryStorage
+
+            _storage = MemoryStorage()
+        elif STORAGE_BACKEND in _BACKENDS:
+            _storage = _BACKENDS[STORAGE_BACKEND]()
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND '{STORAGE_BACKEND}'")
+    return _storage
+
+
+def set_storage(storage: Storage) -> None:
+    """Install a storage backend explicitly (e.g. a fresh MemoryStorage per test)."""
+    global _storage
+    _storage = storage
@@ -0,0 +1,145 @@
+"""Upstream API fetch for API-enabled tags.
+
+Tags with ``api_active`` set name an ``api_endpoint`` to call when their data
+is fetched. Calls go through one shared, connection-pooled ``httpx.AsyncClient``
+and run concurrently, limited per upstream host. Successful responses are
+cached for ``TAG_API_CACHE_TTL`` seconds, and the outcome of each call is
+recorded in the tag's ``api_message``.
+
+Relative endpoints (e.g. ``/api/sales``) are resolved against
+``TAG_API_BASE_URL``, which also makes it easy to point at a local stub server.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+import httpx
+
+from config import (
+    TAG_API_BASE_URL,
+    TAG_API_CACHE_TTL,
+    TAG_API_MAX_CONNECTIONS,
+    TAG_API_PER_HOST_LIMIT,
+    TAG_API_TIMEOUT,
+)
+
+_client: httpx.AsyncClient | None = None
+_host_limits: dict[str, asyncio.Semaphore] = {}
+_cache: dict[tuple, tuple[float, int, Any]] = {}
+_CACHE_MAX_ENTRIES = 1024
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=TAG_API_BASE_URL,
+            timeout=httpx.Timeout(TAG_API_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=TAG_API_MAX_CONNECTIONS,
+                max_keepalive_connections=TAG_API_MAX_CONNECTIONS,
+            ),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared client (called on application shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_limits.clear()
+
+
+def clear_cache() -> None:
+    _cache.clear()
+
+
+def _cache_put(key: tuple, status_code: int, data: Any) -> None:
+    now = time.monotonic()
+    if len(_cache) >= _CACHE_MAX_ENTRIES:
+        for k in [k for k, v in _cache.items() if v[0] <= now]:
+            del _cache[k]
+        while len(_cache) >= _CACHE_MAX_ENTRIES:
+            del _cache[next(iter(_cache))]
+    _cache[key] = (now + TAG_API_CACHE_TTL, status_code, data)
+
+
+def _host_limit(host: str) -> asyncio.Semaphore:
+    if host not in _host_limits:
+        _host_limits[host] = asyncio.Semaphore(TAG_API_PER_HOST_LIMIT)
+    return _host_limits[host]
+
+
+def api_params(tag: dict, values: dict) -> dict:
+    """Select the supplied values for params flagged ``api_param``."""
+    return {
+        p["db_column"]: values[p["db_column"]]
+        for p in tag["params"]
+        if p["api_param"] and p["db_column"] in values
+    }
+
+
+def _decode(response: httpx.Response) -> Any:
+    if "json" in response.headers.get("content-type", ""):
+        return response.json()
+    return response.text
+
+
+async def fetch_tag(tag: dict, values: dict) -> dict:
+    """Call one tag's api_endpoint and return a result entry."""
+    result = {"tag_id": tag["id"], "api_name": tag["api_name"], "cached": False}
+    if not tag["api_active"] or not tag["api_endpoint"]:
+        return {**result, "status": "skipped", "error": "API is not active for this tag"}
+
+    client = get_client()
+    try:
+        url = client.build_request("GET", tag["api_endpoint"], params=api_params(tag, values)).url
+    except httpx.InvalidURL as e:
+        return {**result, "status": "error", "error": f"Invalid api_endpoint: {e}"}
+    key = (str(url),)
+
+    entry = _cache.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        _, status_code, data = entry
+        return {**result, "status": "ok", "status_code": status_code, "data": data, "cached": True}
+
+    try:
+        async with _host_limit(url.host):
+            response = await client.get(url)
+    except httpx.HTTPError as e:
+        return {**result, "status": "error", "error": f"{type(e).__name__}: {e}"}
+
+    try:
+        data = _decode(response)
+    except ValueError:
+        data = response.text
+
+    if response.is_success:
+        if TAG_API_CACHE_TTL > 0:
+            _cache_put(key, response.status_code, data)
+        return {**result, "status": "ok", "status_code": response.status_code, "data": data}
+    return {
+        **result,
+        "status": "error",
+        "status_code": response.status_code,
+        "error": f"Upstream returned HTTP {response.status_code}",
+        "data": data,
+    }
+
+
+async def fetch_tags(tags: list[dict], values: dict) -> list[dict]:
+    """Call the api_endpoints of several tags concurrently."""
+    return list(await asyncio.gather(*(fetch_tag(tag, values) for tag in tags)))
+
+
+def result_message(result: dict) -> str:
+    """Summarize a fetch result for the tag's api_message column."""
+    timestamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    if result["status"] == "ok":
+        source = "cache" if result["cached"] else f"HTTP {result['status_code']}"
+        return f"OK ({source}) at {timestamp}"
+    return f"Error at {timestamp}: {result['error']}"
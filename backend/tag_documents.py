@@ -0,0 +1,232 @@
+"""Denormalized tag documents.
+
+Each row of ``tag_documents`` holds the fully rendered tag (including its
+params) as JSONB, so reads are a single primary-key lookup. The documents are
+kept in sync by triggers on ``tags`` and ``params``; ``verify`` and
+``rebuild`` detect and repair drift.
+
+The installed functions carry a version stamp (a hash of ``SCHEMA_SQL``), so a
+changed rendering is detected and re-installed at startup (see migrations.py).
+
+Usage:
+    python tag_documents.py install   # create functions and triggers, re-render stale documents
+    python tag_documents.py verify    # report drifted tag IDs
+    python tag_documents.py rebuild   # repair drifted documents (--all to re-render every tag)
+"""
+import argparse
+import hashlib
+import sys
+
+import psycopg2.extras
+
+from crud_v2 import get_connection
+
+
+SCHEMA_SQL = """
+CREATE OR REPLACE FUNCTION render_tag_document(p_tag_id INTEGER) RETURNS JSONB AS $$
+    SELECT jsonb_build_object(
+        'id', t.id,
+        'tag', t.tag,
+        'query', t.query,
+        'comment', t.comment,
+        'dynamic_param_source', t.dynamic_param_source,
+        'api_active', t.api_active,
+        'api_endpoint', t.api_endpoint,
+        'api_name', t.api_name,
+        'api_at_get_data', t.api_at_get_data,
+        'api_message', t.api_message,
+        'query_active', t.query_active,
+        'tag_active', t.tag_active,
+        'query_cache_ttl', t.query_cache_ttl,
+        'params', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object(
+                'id', p.id,
+                'tag_id', p.tag_id,
+                'db_column', p.db_column,
+                'display_name', p.display_name,
+                'option_value', COALESCE(to_jsonb(p.option_value), '[]'::jsonb),
+                'field_type', p.field_type,
+                'value_type', p.value_type,
+                'api_param', p.api_param
+            ) ORDER BY p.id)
+            FROM params p
+            WHERE p.tag_id = t.id
+        ), '[]'::jsonb)
+    )
+    FROM tags t
+    WHERE t.id = p_tag_id
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION sync_tag_document(p_tag_id INTEGER) RETURNS VOID AS $$
+DECLARE
+    doc JSONB := render_tag_document(p_tag_id);
+BEGIN
+    IF doc IS NULL THEN
+        DELETE FROM tag_documents WHERE tag_id = p_tag_id;
+    ELSE
+        INSERT INTO tag_documents (tag_id, document) VALUES (p_tag_id, doc)
+        ON CONFLICT (tag_id) DO UPDATE SET document = EXCLUDED.document;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tags_sync_document() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM sync_tag_document(NEW.id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level: each tag touched by a statement is re-rendered once,
+-- however many of its param rows the statement changed.
+CREATE OR REPLACE FUNCTION params_sync_documents() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM sync_tag_document(tag_id) FROM (SELECT DISTINCT tag_id FROM new_params) changed;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM sync_tag_document(tag_id) FROM (SELECT DISTINCT tag_id FROM old_params) changed;
+    ELSE
+        PERFORM sync_tag_document(tag_id)
+        FROM (SELECT tag_id FROM old_params UNION SELECT tag_id FROM new_params) changed;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tags_sync_document ON tags;
+CREATE TRIGGER tags_sync_document
+    AFTER INSERT OR UPDATE ON tags
+    FOR EACH ROW EXECUTE FUNCTION tags_sync_document();
+
+-- Transition tables need one trigger per event
+DROP TRIGGER IF EXISTS params_sync_document ON params;
+DROP FUNCTION IF EXISTS params_sync_document();
+
+DROP TRIGGER IF EXISTS params_sync_document_insert ON params;
+CREATE TRIGGER params_sync_document_insert
+    AFTER INSERT ON params
+    REFERENCING NEW TABLE AS new_params
+    FOR EACH STATEMENT EXECUTE FUNCTION params_sync_documents();
+
+DROP TRIGGER IF EXISTS params_sync_document_update ON params;
+CREATE TRIGGER params_sync_document_update
+    AFTER UPDATE ON params
+    REFERENCING OLD TABLE AS old_params NEW TABLE AS new_params
+    FOR EACH STATEMENT EXECUTE FUNCTION params_sync_documents();
+
+DROP TRIGGER IF EXISTS params_sync_document_delete ON params;
+CREATE TRIGGER params_sync_document_delete
+    AFTER DELETE ON params
+    REFERENCING OLD TABLE AS old_params
+    FOR EACH STATEMENT EXECUTE FUNCTION params_sync_documents();
+"""
+
+# Stamped on render_tag_document when installing; changes whenever SCHEMA_SQL does
+SCHEMA_VERSION = hashlib.sha1(SCHEMA_SQL.encode()).hexdigest()[:12]
+
+# Rows of tags whose stored document is missing or differs from a fresh render.
+# Deleted tags need no entry: the foreign key cascades their document away.
+_DRIFT_SQL = """
+SELECT t.id AS tag_id,
+       CASE WHEN d.tag_id IS NULL THEN 'missing' ELSE 'stale' END AS problem
+FROM tags t
+LEFT JOIN tag_documents d ON d.tag_id = t.id
+WHERE d.tag_id IS NULL OR d.document IS DISTINCT FROM render_tag_document(t.id)
+ORDER BY t.id
+"""
+
+
+def install(conn) -> None:
+    """Create the render/sync functions and the triggers on tags and params."""
+    with conn.cursor() as cur:
+        cur.execute(SCHEMA_SQL)
+        cur.execute("COMMENT ON FUNCTION render_tag_document(INTEGER) IS %s", (f"tag_documents {SCHEMA_VERSION}",))
+
+
+def installed_version(conn) -> str | None:
+    """Return the version stamp of the installed functions, or None if not installed."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT obj_description(to_regprocedure('render_tag_document(integer)'), 'pg_proc')")
+        stamp = cur.fetchone()[0]
+    if not stamp or not stamp.startswith("tag_documents "):
+        return None
+    return stamp.split(" ", 1)[1]
+
+
+def rebuild_drifted(conn) -> int:
+    """Re-render missing or stale documents in the current transaction. Returns the number repaired."""
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT sync_tag_document(tag_id) FROM ({_DRIFT_SQL}) drift")
+        return cur.rowcount
+
+
+def verify() -> list[dict]:
+    """Return the tags whose documents are missing or stale."""
+    conn = get_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(_DRIFT_SQL)
+            return [dict(r) for r in cur.fetchall()]
+    finally:
+        conn.close()
+
+
+def rebuild(full: bool = False) -> int:
+    """Re-render drifted documents (or every document if ``full``). Returns the number repaired."""
+    conn = get_connection()
+    try:
+        if full:
+            with conn.cursor() as cur:
+                cur.execute("SELECT sync_tag_document(id) FROM tags")
+                repaired = cur.rowcount
+        else:
+            repaired = rebuild_drifted(conn)
+        conn.commit()
+        return repaired
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Manage the denormalized tag_documents table.")
+    parser.add_argument("command", choices=["install", "verify", "rebuild"])
+    parser.add_argument("--all", action="store_true", help="rebuild: re-render every tag, not just drifted ones")
+    args = parser.parse_args(argv)
+
+    if args.command == "install":
+        conn = get_connection()
+        try:
+            install(conn)
+            repaired = rebuild_drifted(conn)
+            conn.commit()
+        finally:
+            conn.close()
+        print(f"Installed tag document triggers (version {SCHEMA_VERSION}), rebuilt {repaired} document(s)")
+        return 0
+
+    if args.command == "verify":
+        conn = get_connection()
+        try:
+            version = installed_version(conn)
+        finally:
+            conn.close()
+        if version != SCHEMA_VERSION:
+            # The drift check renders with the installed (old) function
+            print(f"Installed functions are version {version}, expected {SCHEMA_VERSION}; run install first")
+            return 1
+        drift = verify()
+        for row in drift:
+            print(f"tag {row['tag_id']}: {row['problem']}")
+        print(f"{len(drift)} drifted document(s)")
+        return 1 if drift else 0
+
+    repaired = rebuild(full=args.all)
+    print(f"Rebuilt {repaired} document(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""Execution of a tag's stored query.
+
+Queries use ``:name`` placeholders that refer to the tag's params by
+``db_column``. Values are coerced according to each param's ``value_type``,
+then the query (which must be a single statement) runs in a read-only
+transaction with a statement timeout and rows are streamed back as JSON.
+Results are cached per (tag version, bound params) in a size-bounded LRU with
+the tag's own TTL.
+"""
+import hashlib
+import json
+import re
+from typing import Any, Iterator
+
+import psycopg2
+import psycopg2.errors
+
+from cache import TagCache
+from config import (
+    QUERY_CACHE_MAX_ENTRIES,
+    QUERY_CACHE_MAX_ROWS,
+    QUERY_FETCH_BATCH_SIZE,
+    QUERY_STATEMENT_TIMEOUT_MS,
+)
+from crud_v2 import get_query_connection
+
+
+# Postgres identifiers may contain "$" and any non-ASCII character, so a "$tag$"
+# or "E'" glued to one is part of the identifier, not the start of a string.
+_NOT_AFTER_IDENT = r"(?<![\w$\x80-\U0010ffff])"
+
+# Quoted literals (with backslash escapes in E'...' strings), quoted identifiers,
+# dollar-quoted strings and comments are matched first so their contents are
+# skipped; "name" is a placeholder (but not the "::type" cast syntax) and
+# "semicolon" a statement separator.
+_PLACEHOLDER_RE = re.compile(
+    _NOT_AFTER_IDENT + r"""[Ee]'(?:[^'\\]|\\.|'')*'"""
+    r"""|'(?:[^']|'')*'"""
+    r'|"(?:[^"]|"")*"'
+    r"|" + _NOT_AFTER_IDENT + r"\$(?P<dollar>(?:[A-Za-z_]\w*)?)\$.*?\$(?P=dollar)\$"
+    r"|--[^\n]*"
+    r"|(?P<comment>/\*.*?\*/)"
+    r"|(?<![:\w]):(?P<name>[A-Za-z_]\w*)"
+    r"|(?P<semicolon>;)",
+    re.DOTALL,
+)
+
+
+class QueryParamError(ValueError):
+    """Supplied param values do not match the tag's param definitions."""
+
+
+class QueryExecutionError(Exception):
+    """The database rejected the query."""
+
+
+class QueryTimeoutError(QueryExecutionError):
+    """The query exceeded the statement timeout."""
+
+
+class MultipleStatementsError(QueryExecutionError):
+    """The query is not a single statement."""
+
+
+# ============== Binding ==============
+
+def placeholders(query: str) -> list[str]:
+    """Return the distinct placeholder names used by a query, in order."""
+    return list(dict.fromkeys(m["name"] for m in _PLACEHOLDER_RE.finditer(query) if m["name"]))
+
+
+def compile_query(query: str) -> str:
+    """Rewrite ``:name`` placeholders into psycopg2's ``%(name)s`` style."""
+    return _PLACEHOLDER_RE.sub(
+        lambda m: f"%({m['name']})s" if m["name"] else m.group(0),
+        query.replace("%", "%%"),
+    )
+
+
+def ensure_single_statement(query: str) -> None:
+    """Reject queries that could run more than one statement.
+
+    psycopg2 sends a query as one string and Postgres runs every statement in
+    it, so a second statement could COMMIT the read-only transaction and write.
+    Nested block comments are rejected too, since the lexer does not nest them.
+    """
+    for m in _PLACEHOLDER_RE.finditer(query):
+        if m["semicolon"]:
+            raise MultipleStatementsError("Query must be a single statement without ';'")
+        if m["comment"] and "/*" in m["comment"][2:]:
+            raise MultipleStatementsError("Query must not contain nested block comments")
+
+
+def _coerce(value: Any, value_type: str, name: str) -> Any:
+    if value_type == "number":
+        if isinstance(value, bool):
+            raise QueryParamError(f"Param '{name}' must be a number")
+        if isinstance(value, (int, float)):
+            return value
+        if isinstance(value, str):
+            try:
+                return int(value)
+            except ValueError:
+                try:
+                    return float(value)
+                except ValueError:
+                    pass
+        raise QueryParamError(f"Param '{name}' must be a number")
+    if value_type == "string":
+        if not isinstance(value, str):
+            raise QueryParamError(f"Param '{name}' must be a string")
+        return value
+    raise QueryParamError(f"Param '{name}' has unsupported value_type '{value_type}'")
+
+
+def bind_params(query: str, param_defs: list[dict], values: dict) -> dict:
+    """Type-check supplied values against the params referenced by ``query``."""
+    defs = {p["db_column"]: p for p in param_defs}
+    names = placeholders(query)
+
+    unknown = set(values) - set(names)
+    if unknown:
+        raise QueryParamError(f"Unknown params: {', '.join(sorted(unknown))}")
+
+    bound = {}
+    for name in names:
+        if name not in defs:
+            raise QueryParamError(f"Query placeholder ':{name}' has no matching param")
+        if name not in values:
+            raise QueryParamError(f"Missing value for param '{name}'")
+        param = defs[name]
+        value = _coerce(values[name], param["value_type"], name)
+        options = param.get("option_value") or []
+        if param.get("field_type") == "select" and options:
+            allowed = [_coerce(o, param["value_type"], name) for o in options]
+            if value not in allowed:
+                raise QueryParamError(f"Param '{name}' must be one of: {', '.join(options)}")
+        bound[name] = value
+    return bound
+
+
+def tag_version(tag: dict) -> str:
+    """Fingerprint of everything that affects a tag's query results."""
+    payload = json.dumps(
+        [tag["query"], [(p["db_column"], p["value_type"]) for p in tag["params"]]],
+        sort_keys=True,
+    )
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+# ============== Result Cache ==============
+
+result_cache = TagCache(QUERY_CACHE_MAX_ENTRIES)
+
+
+# ============== Execution ==============
+
+def _encode(columns: list[str], rows: Iterator[list]) -> Iterator[bytes]:
+    yield b'{"columns": ' + json.dumps(columns).encode() + b', "rows": ['
+    first = True
+    for row in rows:
+        yield (b"" if first else b", ") + json.dumps(row, default=str).encode()
+        first = False
+    yield b"]}"
+
+
+def _stream_rows(conn, cur, first_batch: list, key: tuple, columns: list[str], ttl: int) -> Iterator[list]:
+    """Yield rows from an open server-side cursor, caching them if small enough."""
+    collected: list[list] | None = []
+    try:
+        batch = first_batch
+        while batch:
+            for row in batch:
+                row = list(row)
+                if collected is not None:
+                    collected.append(row)
+                    if len(collected) > QUERY_CACHE_MAX_ROWS:
+                        collected = None
+                yield row
+            batch = cur.fetchmany(QUERY_FETCH_BATCH_SIZE)
+        if collected is not None:
+            result_cache.put(key, (columns, collected), ttl)
+    finally:
+        cur.close()
+        conn.rollback()
+        conn.close()
+
+
+def execute(tag: dict, bound: dict) -> tuple[bool, Iterator[bytes]]:
+    """Run a tag's query, returning (cache_hit, JSON body chunks).
+
+    The query is executed and its first batch fetched before returning, so
+    errors surface as exceptions rather than as a truncated stream.
+    """
+    ensure_single_statement(tag["query"])
+    key = (tag["id"], tag_version(tag), tuple(sorted(bound.items())))
+    cached = result_cache.get(key)
+    if cached is not None:
+        columns, rows = cached
+        return True, _encode(columns, iter(rows))
+
+    conn = get_query_connection()
+    try:
+        conn.set_session(readonly=True)
+        with conn.cursor() as setup:
+            setup.execute("SET LOCAL statement_timeout = %s", (QUERY_STATEMENT_TIMEOUT_MS,))
+        cur = conn.cursor(name=f"tag_query_{tag['id']}")
+        cur.execute(compile_query(tag["query"]), bound)
+        first_batch = cur.fetchmany(QUERY_FETCH_BATCH_SIZE)
+        columns = [d.name for d in cur.description]
+    except psycopg2.errors.QueryCanceled as e:
+        conn.close()
+        raise QueryTimeoutError(str(e).strip()) from e
+    except psycopg2.Error as e:
+        conn.close()
+        raise QueryExecutionError(str(e).strip()) from e
+    except Exception:
+        conn.close()
+        raise
+
+    rows = _stream_rows(conn, cur, first_batch, key, columns, tag.get("query_cache_ttl") or 0)
+    return False, _encode(columns, rows)
@@ -0,0 +1,45 @@
+import os
+import sys
+
+# Tests run without Postgres: the v2 routes use the in-memory storage backend and
+# startup skips the schema check. Set before any application module reads config.
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import storage  # noqa: E402
+from memory_storage import MemoryStorage  # noqa: E402
+
+
+@pytest.fixture
+def memory_storage():
+    """A fresh in-memory backend for the v2 routes."""
+    backend = MemoryStorage()
+    storage.set_storage(backend)
+    yield backend
+    storage.set_storage(None)
+
+
+@pytest.fixture
+def client(memory_storage):
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def postgres():
+    """Skip unless the configured DATABASE_URL is reachable."""
+    import psycopg2
+
+    from crud_v2 import get_connection
+
+    try:
+        get_connection().close()
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"Postgres not available: {str(e).strip()}")
@@ -0,0 +1,195 @@
+import asyncio
+
+import pytest
+
+import admission
+from admission import READ, SCAN, WRITE, AdmissionController, Rejected, classify
+
+
+def _controller(**overrides) -> AdmissionController:
+    settings = {"max_concurrency": 1, "max_scan_concurrency": 1, "max_queue": 10, "queue_timeout": 5}
+    settings.update(overrides)
+    return AdmissionController(**settings)
+
+
+async def _settle() -> None:
+    """Let queued tasks run until they block."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.parametrize(
+    "method, path, expected",
+    [
+        ("POST", "/tags", WRITE),
+        ("PUT", "/v2/tags/3", WRITE),
+        ("DELETE", "/v2/tags", WRITE),
+        ("POST", "/v2/tags/3/params", WRITE),
+        ("POST", "/v2/tags/3/execute", SCAN),
+        ("POST", "/v2/tags/api-data", SCAN),
+        ("POST", "/v2/tags/3/api-data", SCAN),
+        ("GET", "/v2/tags", SCAN),
+        ("GET", "/tags/", SCAN),
+        ("GET", "/v2/tags/by-option", SCAN),
+        ("GET", "/v2/tags/3", READ),
+        ("GET", "/health", None),
+        ("GET", "/metrics/admission", None),
+        ("OPTIONS", "/v2/tags", None),
+    ],
+)
+def test_classify(method, path, expected):
+    assert classify(method, path) == expected
+
+
+def test_waiters_are_admitted_in_priority_order():
+    async def run():
+        controller = _controller()
+        await controller.acquire(WRITE)
+        order = []
+
+        async def request(priority):
+            await controller.acquire(priority)
+            order.append(priority)
+            controller.release(priority)
+
+        tasks = [asyncio.create_task(request(p)) for p in (SCAN, READ, SCAN, WRITE, READ)]
+        await _settle()
+        assert controller.snapshot()["queued"] == 5
+
+        controller.release(WRITE)
+        await asyncio.gather(*tasks)
+        return order, controller.snapshot()
+
+    order, snapshot = asyncio.run(run())
+    assert order == [WRITE, READ, READ, SCAN, SCAN]
+    assert snapshot["active"] == 0 and snapshot["queued"] == 0
+
+
+def test_scans_are_capped_but_do_not_block_reads():
+    async def run():
+        controller = _controller(max_concurrency=3, max_scan_concurrency=1)
+        await controller.acquire(SCAN)
+        second_scan = asyncio.create_task(controller.acquire(SCAN))
+        await _settle()
+        read_wait = await asyncio.wait_for(controller.acquire(READ), 1)
+        assert not second_scan.done()
+
+        controller.release(SCAN)
+        await asyncio.wait_for(second_scan, 1)
+        return read_wait, controller.snapshot()
+
+    read_wait, snapshot = asyncio.run(run())
+    assert read_wait == 0.0
+    assert snapshot["active"] == 2 and snapshot["active_scans"] == 1
+
+
+def test_full_queue_sheds_lowest_priority_waiter():
+    async def run():
+        controller = _controller(max_queue=2)
+        await controller.acquire(WRITE)
+        scans = [asyncio.create_task(controller.acquire(SCAN)) for _ in range(2)]
+        await _settle()
+
+        # A write displaces the newest scan...
+        write = asyncio.create_task(controller.acquire(WRITE))
+        await _settle()
+        with pytest.raises(Rejected):
+            await scans[1]
+
+        # ...but a request that ranks no higher than the worst waiter is rejected itself
+        with pytest.raises(Rejected):
+            await controller.acquire(SCAN)
+
+        controller.release(WRITE)
+        await asyncio.wait_for(write, 1)
+        controller.release(WRITE)
+        await asyncio.wait_for(scans[0], 1)
+        controller.release(SCAN)
+        return controller.snapshot()
+
+    snapshot = asyncio.run(run())
+    assert snapshot["active"] == 0 and snapshot["queued"] == 0
+    assert snapshot["priorities"]["scan"]["rejected"] == 2
+    assert snapshot["priorities"]["write"]["rejected"] == 0
+
+
+def test_queue_timeout_rejects_and_dequeues():
+    async def run():
+        controller = _controller(queue_timeout=0.05)
+        await controller.acquire(WRITE)
+        with pytest.raises(Rejected):
+            await controller.acquire(READ)
+        return controller.snapshot()
+
+    snapshot = asyncio.run(run())
+    assert snapshot["active"] == 1 and snapshot["queued"] == 0
+    assert snapshot["priorities"]["read"]["rejected"] == 1
+
+
+def test_grant_racing_the_timeout_keeps_the_slot(monkeypatch):
+    controller = _controller()
+
+    async def grant_then_time_out(awaitable, timeout):
+        # The slot is handed over at the same moment the timeout fires
+        controller.release(WRITE)
+        awaitable.cancel()
+        raise asyncio.TimeoutError
+
+    async def run():
+        await controller.acquire(WRITE)
+        monkeypatch.setattr(admission.asyncio, "wait_for", grant_then_time_out)
+        waited = await controller.acquire(READ)
+        monkeypatch.undo()
+        return waited, controller.snapshot()
+
+    waited, snapshot = asyncio.run(run())
+    assert waited >= 0
+    assert snapshot["active"] == 1 and snapshot["queued"] == 0
+    assert snapshot["priorities"]["read"]["admitted"] == 1
+    assert snapshot["priorities"]["read"]["rejected"] == 0
+
+    controller.release(READ)
+    assert controller.snapshot()["active"] == 0
+
+
+def test_cancelled_waiter_is_dequeued():
+    async def run():
+        controller = _controller()
+        await controller.acquire(WRITE)
+        waiter = asyncio.create_task(controller.acquire(READ))
+        await _settle()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        controller.release(WRITE)
+        return controller.snapshot()
+
+    snapshot = asyncio.run(run())
+    assert snapshot["active"] == 0 and snapshot["queued"] == 0
+
+
+def test_cancel_after_grant_does_not_leak_the_slot():
+    async def run():
+        controller = _controller()
+        await controller.acquire(WRITE)
+        waiter = asyncio.create_task(controller.acquire(READ))
+        await _settle()
+
+        # Grant the slot, then cancel before the waiter has resumed
+        controller.release(WRITE)
+        waiter.cancel()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            pass  # acquire() gave the slot back
+        else:
+            controller.release(READ)  # cancellation lost the race; the caller owns the slot
+
+        # The slot is free again
+        await asyncio.wait_for(controller.acquire(WRITE), 1)
+        controller.release(WRITE)
+        return controller.snapshot()
+
+    snapshot = asyncio.run(run())
+    assert snapshot["active"] == 0 and snapshot["queued"] == 0
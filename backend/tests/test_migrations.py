@@ -0,0 +1,17 @@
+import pytest
+
+import migrations
+
+
+def test_unknown_startup_mode_is_rejected_before_connecting(monkeypatch):
+    def connect():
+        raise AssertionError("ensure_schema connected for an unknown mode")
+
+    monkeypatch.setattr(migrations, "get_connection", connect)
+    with pytest.raises(ValueError, match="Unknown SCHEMA_STARTUP_MODE 'chek'"):
+        migrations.ensure_schema("chek")
+
+
+def test_off_mode_does_not_connect(monkeypatch):
+    monkeypatch.setattr(migrations, "get_connection", lambda: pytest.fail("ensure_schema connected in off mode"))
+    assert migrations.ensure_schema("off")["applied"] == []
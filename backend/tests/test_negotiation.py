@@ -0,0 +1,55 @@
+import msgpack
+import pytest
+
+import negotiation
+
+
+class FakeRequest:
+    def __init__(self, accept: str):
+        self.headers = {"accept": accept}
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        ("application/msgpack", True),
+        ("application/x-msgpack", True),
+        ("application/msgpack;q=0.9, */*;q=0.1", True),
+        ("application/json, application/msgpack;q=0.5", False),
+        ("application/msgpack;q=0", False),
+        ("*/*", False),
+        ("", False),
+    ],
+)
+def test_wants_msgpack(accept, expected):
+    assert negotiation.wants_msgpack(FakeRequest(accept)) is expected
+
+
+def test_to_columnar_uses_the_union_of_fields():
+    rows = [{"id": 1, "tag": "a"}, {"id": 2, "tag": "b", "query_cache_ttl": 30}]
+
+    assert negotiation.to_columnar(rows) == {"id": [1, 2], "tag": ["a", "b"], "query_cache_ttl": [None, 30]}
+    assert negotiation.to_columnar([]) == {}
+
+
+def test_render_msgpack_columnar():
+    response = negotiation.render(FakeRequest("application/msgpack"), [{"id": 1}, {"id": 2}], "columnar")
+
+    assert response.media_type == "application/msgpack"
+    assert response.headers["vary"] == "Accept"
+    assert msgpack.unpackb(response.body) == {"id": [1, 2]}
+
+
+def test_list_routes_negotiate_format(client):
+    for name in ("t1", "t2"):
+        client.post("/v2/tags", json={"tag": name})
+
+    assert client.get("/v2/tags", params={"layout": "columnar"}).json()["tag"] == ["t1", "t2"]
+    assert client.get("/v2/tags", params={"layout": "wide"}).status_code == 422
+
+    response = client.get("/v2/tags", headers={"Accept": "application/msgpack"})
+    assert response.headers["content-type"] == "application/msgpack"
+    assert [t["tag"] for t in msgpack.unpackb(response.content)] == ["t1", "t2"]
+
+    response = client.get("/v2/tags/1", headers={"Accept": "application/msgpack"})
+    assert msgpack.unpackb(response.content)["tag"] == "t1"
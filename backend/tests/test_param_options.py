@@ -0,0 +1,66 @@
+import pytest
+
+import param_options
+
+TAG = {"id": 1, "dynamic_param_source": "sql:SELECT region FROM sales", "params": []}
+PARAM = {"id": 2, "tag_id": 1, "db_column": "region", "option_value": ["east", "north", "west"]}
+
+
+@pytest.fixture
+def distinct(monkeypatch):
+    """Serve dynamic options from a list, cut off like _fetch_distinct at max_values."""
+    def install(values: list[str], max_values: int):
+        kept = sorted(values)
+        monkeypatch.setattr(
+            param_options, "_fetch_distinct", lambda query, column: (kept[:max_values], len(kept) > max_values)
+        )
+    param_options.options_cache.clear()
+    yield install
+    param_options.options_cache.clear()
+
+
+def test_dynamic_prefix_search_and_paging(distinct):
+    distinct(["apac", "emea", "eu-central", "eu-west", "latam"], max_values=10)
+
+    page = param_options.resolve(TAG, PARAM, "auto", "eu", 1, 10)
+
+    assert page["source"] == "dynamic"
+    assert page["total"] == 2
+    assert page["values"] == ["eu-west"]
+    assert page["truncated"] is False
+
+
+def test_truncated_only_when_matches_reach_the_cut_off(distinct):
+    distinct(["aa", "ab", "ba", "bb", "bc"], max_values=3)
+
+    complete = param_options.resolve(TAG, PARAM, "dynamic", "a", 0, 10)
+    partial = param_options.resolve(TAG, PARAM, "dynamic", "b", 0, 10)
+    everything = param_options.resolve(TAG, PARAM, "dynamic", "", 0, 10)
+
+    assert (complete["values"], complete["truncated"]) == (["aa", "ab"], False)
+    assert (partial["values"], partial["truncated"]) == (["ba"], True)
+    assert everything["total"] == 3 and everything["truncated"] is True
+
+
+def test_static_options():
+    page = param_options.resolve({**TAG, "dynamic_param_source": ""}, PARAM, "auto", "n", 0, 10)
+
+    assert page["source"] == "static"
+    assert page["values"] == ["north"]
+    assert page["truncated"] is False
+
+
+def test_source_query_rejects_other_schemes():
+    assert param_options.source_query(" sql: SELECT 1 ") == "SELECT 1"
+    with pytest.raises(param_options.OptionSourceError):
+        param_options.source_query("http://example.com/options")
+    with pytest.raises(param_options.OptionSourceError):
+        param_options.source_query("  ")
+
+
+def test_fetch_distinct_sorts_and_cuts_off_in_python_order(postgres, monkeypatch):
+    query = "SELECT * FROM (VALUES ('b'), ('Z'), ('a'), ('é'), ('b'), (NULL)) AS v(region)"
+
+    assert param_options._fetch_distinct(query, "region") == (["Z", "a", "b", "é"], False)
+    monkeypatch.setattr(param_options, "DYNAMIC_OPTIONS_MAX_VALUES", 2)
+    assert param_options._fetch_distinct(query, "region") == (["Z", "a"], True)
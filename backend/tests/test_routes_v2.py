@@ -0,0 +1,123 @@
+"""v2 routes against the in-memory storage backend."""
+import pytest
+
+TAG = {
+    "tag": "sales",
+    "query": "SELECT * FROM sales WHERE region = :region",
+    "params": [
+        {"db_column": "region", "display_name": "Region", "option_value": ["emea", "latam", "na"], "field_type": "select"},
+        {"db_column": "year", "display_name": "Year", "value_type": "number"},
+    ],
+}
+
+
+def _create(client, **overrides) -> int:
+    response = client.post("/v2/tags", json={**TAG, **overrides})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def test_tag_crud(client):
+    tag_id = _create(client)
+
+    tag = client.get(f"/v2/tags/{tag_id}").json()
+    assert tag["tag"] == "sales"
+    assert tag["tag_active"] is True and tag["query_cache_ttl"] == 0
+    assert [p["db_column"] for p in tag["params"]] == ["region", "year"]
+
+    response = client.put(f"/v2/tags/{tag_id}", json={"comment": "updated", "params": [TAG["params"][1]]})
+    assert response.status_code == 200
+    tag = client.get(f"/v2/tags/{tag_id}").json()
+    assert tag["comment"] == "updated"
+    assert [p["db_column"] for p in tag["params"]] == ["year"]
+
+    assert client.delete(f"/v2/tags/{tag_id}").status_code == 200
+    assert client.get(f"/v2/tags/{tag_id}").status_code == 404
+    assert client.get("/v2/params").json() == []
+
+
+def test_list_tags_paginates_and_filters_by_name(client):
+    ids = [_create(client, tag=name) for name in ("a1", "b1", "a1", "c1")]
+
+    assert [t["id"] for t in client.get("/v2/tags", params={"skip": 1, "limit": 2}).json()] == ids[1:3]
+    assert [t["id"] for t in client.get("/v2/tags", params={"tag": "a1"}).json()] == [ids[0], ids[2]]
+
+
+def test_tag_filter_is_rejected_with_documents_source(client, monkeypatch):
+    import routes_v2
+
+    monkeypatch.setattr(routes_v2, "TAG_DOCUMENTS_ENABLED", True)
+    response = client.get("/v2/tags", params={"source": "documents", "tag": "a1"})
+    assert response.status_code == 422
+
+
+def test_param_routes(client):
+    tag_id = _create(client, params=[])
+
+    response = client.post(f"/v2/tags/{tag_id}/params", json={"db_column": "c", "display_name": "C"})
+    assert response.status_code == 201
+    param_id = response.json()["id"]
+    assert client.post("/v2/tags/999/params", json={"db_column": "c", "display_name": "C"}).status_code == 404
+
+    client.put(f"/v2/params/{param_id}", json={"option_value": ["x", "y"]})
+    assert client.get(f"/v2/params/{param_id}").json()["option_value"] == ["x", "y"]
+    assert [p["id"] for p in client.get(f"/v2/tags/{tag_id}/params").json()] == [param_id]
+
+    assert client.delete(f"/v2/params/{param_id}").status_code == 200
+    assert client.get(f"/v2/tags/{tag_id}/params").json() == []
+
+
+def test_bulk_update_and_delete(client):
+    keep = _create(client, tag="keep")
+    off = [_create(client, tag=f"off{i}", api_active=False) for i in range(2)]
+    on = _create(client, tag="on", api_active=True)
+
+    response = client.patch(
+        "/v2/tags", json={"filter": {"api_active": False}, "ids": [keep, *off], "values": {"tag_active": False}}
+    )
+    assert response.json()["affected"] == 3
+    assert [t["tag_active"] for t in client.get("/v2/tags").json()] == [False, False, False, True]
+
+    response = client.request("DELETE", "/v2/tags", json={"filter": {"tag_active": False, "api_active": False}})
+    assert response.json()["affected"] == 3
+    assert [t["id"] for t in client.get("/v2/tags").json()] == [on]
+    # Params went with their tags
+    assert {p["tag_id"] for p in client.get("/v2/params").json()} == {on}
+
+
+@pytest.mark.parametrize(
+    "method, body",
+    [
+        ("DELETE", {"filter": {"tag_active": "x"}}),
+        ("DELETE", {"filter": {"comment": "x"}}),
+        ("DELETE", {}),
+        ("DELETE", {"ids": ["a"]}),
+        ("PATCH", {"ids": [1]}),
+        ("PATCH", {"ids": [1], "values": {}}),
+        ("PATCH", {"ids": [1], "values": {"query_cache_ttl": -1}}),
+        ("PATCH", {"ids": [1], "values": {"tag_active": None}}),
+        ("PATCH", {"ids": [1], "values": {"tag": None, "comment": "x"}}),
+        ("PATCH", [1]),
+    ],
+)
+def test_bulk_rejects_invalid_bodies(client, method, body):
+    _create(client)
+    assert client.request(method, "/v2/tags", json=body).status_code == 422
+    assert len(client.get("/v2/tags").json()) == 1
+
+
+def test_option_search(client):
+    emea = _create(client, tag="emea")
+    _create(client, tag="latam", params=[{"db_column": "r", "display_name": "R", "option_value": ["latam"]}])
+
+    params = client.get("/v2/params/by-option", params={"contains": ["emea", "na"]}).json()
+    assert [(p["tag_id"], p["db_column"]) for p in params] == [(emea, "region")]
+
+    tags = client.get("/v2/tags/by-option", params={"overlaps": ["latam", "apac"]}).json()
+    assert [t["tag"] for t in tags] == ["emea", "latam"]
+
+    tags = client.get("/v2/tags/by-option", params={"overlaps": ["latam"], "field_type": "text"}).json()
+    assert [t["tag"] for t in tags] == ["latam"]
+
+    assert client.get("/v2/params/by-option").status_code == 422
+
@@ -0,0 +1,168 @@
+"""Upstream API fetch against an in-process stub HTTP server."""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import tag_api
+
+STUB_DELAY = 0.2
+
+
+class StubState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    state = StubState()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with state.lock:
+                state.hits += 1
+                state.in_flight += 1
+                state.max_in_flight = max(state.max_in_flight, state.in_flight)
+            time.sleep(STUB_DELAY)
+            with state.lock:
+                state.in_flight -= 1
+            url = urlparse(self.path)
+            status = 500 if url.path == "/fail" else 200
+            body = json.dumps({"path": url.path, "query": parse_qs(url.query)}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setattr(tag_api, "TAG_API_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(tag_api, "_client", None)
+    tag_api._host_limits.clear()
+    tag_api.clear_cache()
+    yield state
+    server.shutdown()
+    server.server_close()
+    tag_api.clear_cache()
+
+
+def _tag(tag_id: int, endpoint: str, **overrides) -> dict:
+    tag = {
+        "id": tag_id,
+        "api_name": f"api{tag_id}",
+        "api_active": True,
+        "api_endpoint": endpoint,
+        "params": [{"db_column": "region", "api_param": True}, {"db_column": "limit", "api_param": False}],
+    }
+    tag.update(overrides)
+    return tag
+
+
+async def _fetch(tags: list[dict], values: dict) -> list[dict]:
+    try:
+        return await tag_api.fetch_tags(tags, values)
+    finally:
+        await tag_api.close_client()
+
+
+def test_fetches_run_concurrently(stub):
+    tags = [_tag(i, f"/api/{i}") for i in range(1, 6)]
+
+    started = time.perf_counter()
+    results = asyncio.run(_fetch(tags, {"region": "eu", "limit": 5}))
+    elapsed = time.perf_counter() - started
+
+    assert [r["status"] for r in results] == ["ok"] * 5
+    assert stub.max_in_flight > 1
+    assert elapsed < STUB_DELAY * len(tags)
+    # Only params flagged api_param are forwarded
+    assert results[0]["data"] == {"path": "/api/1", "query": {"region": ["eu"]}}
+
+
+def test_per_host_limit(stub, monkeypatch):
+    monkeypatch.setattr(tag_api, "TAG_API_PER_HOST_LIMIT", 2)
+    tags = [_tag(i, f"/api/{i}") for i in range(1, 7)]
+
+    results = asyncio.run(_fetch(tags, {}))
+
+    assert all(r["status"] == "ok" for r in results)
+    assert stub.max_in_flight == 2
+
+
+def test_successful_responses_are_cached(stub):
+    tags = [_tag(1, "/api/cached"), _tag(2, "/fail")]
+
+    first = asyncio.run(_fetch(tags, {"region": "eu"}))
+    second = asyncio.run(_fetch(tags, {"region": "eu"}))
+    other_values = asyncio.run(_fetch(tags[:1], {"region": "us"}))
+
+    assert [r["cached"] for r in first] == [False, False]
+    assert second[0]["cached"] is True and second[0]["data"] == first[0]["data"]
+    # Failures are not cached, and different api_param values are a different entry
+    assert second[1]["cached"] is False and second[1]["status_code"] == 500
+    assert other_values[0]["cached"] is False
+    assert stub.hits == 4
+
+
+def test_inactive_tags_are_skipped(stub):
+    results = asyncio.run(_fetch([_tag(1, "/api/1", api_active=False), _tag(2, "")], {}))
+
+    assert [r["status"] for r in results] == ["skipped", "skipped"]
+    assert stub.hits == 0
+
+
+def _create(client, **tag) -> int:
+    return client.post("/v2/tags", json={"api_active": True, **tag}).json()["id"]
+
+
+def test_api_data_route_records_api_message(stub, client):
+    ok_id = _create(client, tag="ok", api_endpoint="/api/ok")
+    bad_id = _create(client, tag="bad", api_endpoint="/fail")
+
+    response = client.post(f"/v2/tags/{ok_id}/api-data", json={"params": {}})
+    assert response.status_code == 200
+    assert response.json()["status"] == "ok"
+    assert client.post(f"/v2/tags/{bad_id}/api-data").json()["status"] == "error"
+
+    ok_message = client.get(f"/v2/tags/{ok_id}").json()["api_message"]
+    assert ok_message.startswith("OK (HTTP 200)")
+    bad_message = client.get(f"/v2/tags/{bad_id}").json()["api_message"]
+    assert bad_message.startswith("Error at") and "HTTP 500" in bad_message
+
+    # A cached result does not overwrite the recorded message
+    assert client.post(f"/v2/tags/{ok_id}/api-data").json()["cached"] is True
+    assert client.get(f"/v2/tags/{ok_id}").json()["api_message"] == ok_message
+
+
+def test_multi_tag_api_data_route(stub, client):
+    ids = [_create(client, tag=f"t{i}", api_endpoint=f"/api/{i}") for i in range(3)]
+    skipped = _create(client, tag="off", api_active=False)
+
+    results = client.post("/v2/tags/api-data", json={"tag_ids": [*ids, skipped]}).json()
+
+    assert [r["tag_id"] for r in results] == [*ids, skipped]
+    assert [r["status"] for r in results] == ["ok", "ok", "ok", "skipped"]
+    assert stub.max_in_flight > 1
+    assert client.get(f"/v2/tags/{skipped}").json()["api_message"] == ""
+    assert client.post("/v2/tags/api-data", json={"tag_ids": [ids[0], 999]}).status_code == 404
+
+
+@pytest.mark.parametrize("body", [{"params": [1]}, {"params": "x"}, [1]])
+def test_api_data_route_rejects_non_object_params(stub, client, body):
+    tag_id = _create(client, tag="ok", api_endpoint="/api/ok")
+    assert client.post(f"/v2/tags/{tag_id}/api-data", json=body).status_code == 422
+    assert client.post("/v2/tags/api-data", json=body).status_code == 422
+    assert stub.hits == 0
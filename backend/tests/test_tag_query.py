@@ -0,0 +1,109 @@
+import pytest
+
+from tag_query import (
+    MultipleStatementsError,
+    QueryParamError,
+    bind_params,
+    compile_query,
+    ensure_single_statement,
+    placeholders,
+)
+
+PARAMS = [
+    {"db_column": "region", "value_type": "string", "field_type": "select", "option_value": ["emea", "na"]},
+    {"db_column": "year", "value_type": "number", "field_type": "text", "option_value": []},
+    {"db_column": "code", "value_type": "number", "field_type": "select", "option_value": ["1", "2.5"]},
+]
+
+
+@pytest.mark.parametrize(
+    "query, names",
+    [
+        ("SELECT * FROM t WHERE a = :a AND b = :b AND c = :a", ["a", "b"]),
+        ("SELECT ':a', 'it''s :b' FROM t WHERE c = :c", ["c"]),
+        ('SELECT ":a" FROM t WHERE b = :b', ["b"]),
+        ("SELECT E'it\\'s :q' FROM t WHERE b = :b", ["b"]),
+        ("SELECT e'\\\\' || :b", ["b"]),
+        ("SELECT $$ :a $$, $fn$ :b $x$ $fn$ WHERE c = :c", ["c"]),
+        ("SELECT :a -- and :b\n, /* :c */ :d", ["a", "d"]),
+        ("SELECT x::text, :a::int, y ::date FROM t", ["a"]),
+        ("SELECT 1 AS foo$bar$, :a, $bar$", ["a"]),
+    ],
+)
+def test_placeholders_skip_quoted_spans_comments_and_casts(query, names):
+    assert placeholders(query) == names
+
+
+def test_identifier_before_quote_does_not_start_an_escape_string():
+    # "namE" is an identifier, so '\' is a standard string ending at the second quote
+    assert placeholders("SELECT namE'\\' , :a, '") == ["a"]
+
+
+def test_compile_query_rewrites_placeholders_only():
+    query = "SELECT '%:a', x::int FROM t WHERE a LIKE :a /* :b */ AND b = E'\\':b'"
+    assert compile_query(query) == "SELECT '%%:a', x::int FROM t WHERE a LIKE %(a)s /* :b */ AND b = E'\\':b'"
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "SELECT 1",
+        "SELECT ';', \";\", $q$;$q$, E'\\';' -- ;\n/* ; */ FROM t",
+    ],
+)
+def test_single_statement_allows_quoted_semicolons(query):
+    ensure_single_statement(query)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "SELECT 1; COMMIT; DELETE FROM tags",
+        "SELECT 1;",
+        "SELECT E'\\'' ; DELETE FROM tags; --'",
+        "SELECT 1 AS foo$bar$ ; DELETE FROM tags; $bar$",
+        "SELECT 1 /* /* */ ' */ ; DELETE FROM tags; -- '",
+        "SELECT 1) AS src; DELETE FROM tags; SELECT (1",
+    ],
+)
+def test_single_statement_rejects_statement_separators(query):
+    with pytest.raises(MultipleStatementsError):
+        ensure_single_statement(query)
+
+
+def test_bind_params_coerces_by_value_type():
+    query = "SELECT * FROM t WHERE region = :region AND year = :year"
+    assert bind_params(query, PARAMS, {"region": "na", "year": "2024"}) == {"region": "na", "year": 2024}
+    assert bind_params(query, PARAMS, {"region": "na", "year": "1.5"})["year"] == 1.5
+    assert bind_params(query, PARAMS, {"region": "na", "year": 7})["year"] == 7
+
+
+@pytest.mark.parametrize(
+    "values, message",
+    [
+        ({"region": "na", "year": "soon"}, "must be a number"),
+        ({"region": "na", "year": True}, "must be a number"),
+        ({"region": 1, "year": 1}, "must be a string"),
+        ({"region": "apac", "year": 1}, "must be one of: emea, na"),
+        ({"region": "na"}, "Missing value for param 'year'"),
+        ({"region": "na", "year": 1, "extra": 1}, "Unknown params: extra"),
+    ],
+)
+def test_bind_params_rejects_invalid_values(values, message):
+    with pytest.raises(QueryParamError, match=message):
+        bind_params("SELECT * FROM t WHERE region = :region AND year = :year", PARAMS, values)
+
+
+def test_bind_params_compares_number_options_numerically():
+    assert bind_params("SELECT :code", PARAMS, {"code": "2.50"}) == {"code": 2.5}
+    with pytest.raises(QueryParamError, match="must be one of"):
+        bind_params("SELECT :code", PARAMS, {"code": 3})
+
+
+def test_bind_params_requires_a_param_for_every_placeholder():
+    with pytest.raises(QueryParamError, match="':missing' has no matching param"):
+        bind_params("SELECT :missing", PARAMS, {"missing": 1})
+
+
+def test_bind_params_ignores_placeholders_in_quotes():
+    assert bind_params("SELECT ':region' WHERE year = :year", PARAMS, {"year": 1}) == {"year": 1}